@@ -5,13 +5,29 @@ import random
 import os
 import logging
 import time
+import uuid
 import gspread
 from google.oauth2.service_account import Credentials
+from sheets_stub import LocalSheet
+from result_log import ResultWriter, make_record_id
+from scenario_sampler import ScenarioSampler
+from session_events import SessionEventLog
+from shadow_model import ShadowEvaluator
+from study_flow import (
+    SCENARIO_DONE, STUDY_DONE, advance, expire_timer, go_back, reset_scenario, start_new_scenario
+)
+from study_logging import configure_logging, get_logger, set_log_context
+from decision_logic import (
+    columns_to_shuffle, score_columns,
+    get_final_prediction, score_matrix, score_statistics
+)
 
 
 # ---------------------------
 # Logging & Page Configuration
 # ---------------------------
+configure_logging()
+logger = get_logger("app")
 
 st.set_page_config(
     page_title="Military Decision-Making App",
@@ -27,7 +43,8 @@ session_vars = [
     "progress", "start_time", "decision_time",
     "submitted_decision", "submitted_feedback",
     "scenario_generated", "model_generated", "revealed_reasoning",
-    "raw_model_prediction", "scenario_count", "flow", "new_step_index"
+    "raw_model_prediction", "scenario_count", "flow", "new_step_index",
+    "scenario_plan", "correlation_id", "score_stats"
 ]
 for var in session_vars:
     if var not in st.session_state:
@@ -55,6 +72,13 @@ if "timer_active" not in st.session_state:
     st.session_state.timer_active = False
 if "start" not in st.session_state or st.session_state.start is None:
     st.session_state.start = time.time()
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if "event_log" not in st.session_state:
+    # Binary log of transitions and inputs for session_replay.py; STUDY_EVENT_LOG_DIR="" turns it off
+    event_log_dir = os.environ.get("STUDY_EVENT_LOG_DIR", "session_events")
+    st.session_state.event_log = SessionEventLog.create(event_log_dir, st.session_state.session_id) if event_log_dir else None
+set_log_context(session=st.session_state.session_id, correlation_id=st.session_state.correlation_id)
 
 # ---------------------------
 # Styles for Markdown Elements
@@ -90,96 +114,58 @@ def convert_civilian_presence(value):
         return "0"
 
 # ---------------------------
-# Data Columns & Model Files
+# Model Files
 # ---------------------------
-columns_to_shuffle = [
-    ['Target_Category', 'Target_Category_Score'],
-    ['Target_Vulnerability', 'Target_Vulnerability_Score'],
-    ['Terrain_Type', 'Terrain_Type_Score'],
-    ['Civilian_Presence', 'Civilian_Presence_Score'],
-    ['Damage_Assessment', 'Damage_Assessment_Score'],
-    ['Time_Sensitivity', 'Time_Sensitivity_Score'],
-    ['Weaponeering', 'Weaponeering_Score'],
-    ['Friendly_Fire', 'Friendly_Fire_Score'],
-    ['Politically_Sensitive', 'Politically_Sensitive_Score'],
-    ['Legal_Advice', 'Legal_Advice_Score'],
-    ['Ethical_Concerns', 'Ethical_Concerns_Score'],
-    ['Collateral_Damage_Potential', 'Collateral_Damage_Potential_Score'],
-    ['AI_Distinction (%)', 'AI_Distinction (%)_Score'],
-    ['AI_Proportionality (%)', 'AI_Proportionality (%)_Score'],
-    ['AI_Military_Necessity', 'AI_Military_Necessity_Score'],
-    ['Human_Distinction (%)', 'Human_Distinction (%)_Score'],
-    ['Human_Proportionality (%)', 'Human_Proportionality (%)_Score'],
-    ['Human_Military_Necessity', 'Human_Military_Necessity_Score']
-]
-score_columns = [pair[1] for pair in columns_to_shuffle]
-label_mapping = {
-    0: 'Do Not Engage',
-    1: 'Ask Authorization',
-    2: 'Do Not Know',
-    3: 'Engage'
-}
+# Per-artifact load times, read by startup_profiler.py
+startup_timings = {}
+
+def timed_load(label, loader, path):
+    start = time.perf_counter()
+    result = loader(path)
+    startup_timings[label] = time.perf_counter() - start
+    return result
 
 try:
     model_path = 'MDMP_model.joblib'
     features_path = 'MDMP_feature_columns.joblib'
     csv_path = 'dataset_with_all_category_scores.csv'
-    
-    rf_model_loaded = joblib.load(model_path)
-    trained_feature_columns = joblib.load(features_path)
-    df = pd.read_csv(csv_path)
-    print("Loaded data columns:", df.columns.tolist())
-    print("Trained feature columns:", trained_feature_columns)
-    logging.info("Model and data loaded successfully.")
+
+    rf_model_loaded = timed_load("load model", joblib.load, model_path)
+    trained_feature_columns = timed_load("load feature columns", joblib.load, features_path)
+    df = timed_load("load dataset", pd.read_csv, csv_path)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Loaded data columns: %s", df.columns.tolist())
+        logger.debug("Trained feature columns: %s", trained_feature_columns)
+    logger.debug("Model and data loaded successfully.")
 except Exception as e:
     st.error(f"Error loading model or data: {e}")
-    logging.error(f"Error loading model or data: {e}")
+    logger.error("Error loading model or data: %s", e)
     st.stop()
 
-def shuffle_dataset(df):
-    print("Original columns:", df.columns.tolist())
-    df_shuffled = df.copy()
-    for related_columns in columns_to_shuffle:
-        print(f"Processing columns: {related_columns}")
-        shuffled_subset = df[related_columns].sample(frac=1, random_state=random.randint(0, 10000)).reset_index(drop=True)
-        df_shuffled[related_columns] = shuffled_subset
-    df_shuffled['Total_Score'] = df_shuffled[score_columns].sum(axis=1)
-    print("Final columns:", df_shuffled.columns.tolist())
-    return df_shuffled
-
-def get_random_scenario(df):
-    random_index = random.randint(0, len(df) - 1)
-    return df.iloc[random_index]
-
-def calculate_percentages(scores):
-    total_abs = sum(abs(v) for k, v in scores.items() if k != "Total_Score")
-    if total_abs == 0:
-        return {k: 0 for k in scores if k != "Total_Score"}
-    percentages = {
-        k: round((abs(v) / total_abs) * 100, 2) * (1 if v >= 0 else -1)
-        for k, v in scores.items() if k != "Total_Score"
-    }
-    return percentages
+# Scenarios are drawn from a pre-generated pool indexed by the decision Step 5 shows
+SCENARIO_POOL_SIZE = 20000
 
+@st.cache_resource
+def get_scenario_sampler():
+    return ScenarioSampler.from_dataset(df, SCENARIO_POOL_SIZE)
 
-def get_score_display(score, percentage):
-    if score > 0:
-        color = "#28a745"
-    elif score < 0:
-        color = "#dc3545"
-    else:
-        color = "#6c757d"
-    return f"<b>{score}</b> (<span style='color:{color}'>{percentage:.2f}%</span>)"
-
-def assign_final_decision(total_score):
-    if total_score >= 30:
-        return 'Engage'
-    elif total_score >= 22.5:
-        return 'Ask Authorization'
-    elif total_score >= 15:
-        return 'Do Not Know'
-    else:
-        return 'Do Not Engage'
+# Candidate model scored in the background on every Step 5 prediction (see shadow_model.py)
+@st.cache_resource
+def get_shadow_evaluator():
+    candidate_path = os.environ.get("STUDY_SHADOW_MODEL")
+    if not candidate_path:
+        return None
+    # The candidate and its feature columns are loaded on the evaluator's own threads
+    feature_columns = os.environ.get("STUDY_SHADOW_FEATURE_COLUMNS") or trained_feature_columns
+    production = (rf_model_loaded, model_path, startup_timings["load model"])
+    log_path = os.environ.get("STUDY_SHADOW_LOG", "shadow_results.jsonl")
+    return ShadowEvaluator(candidate_path, feature_columns, production, log_path)
+
+def get_score_stats(scenario):
+    # Totals, percentages and score band, computed once per scenario and reused by every render
+    if st.session_state.score_stats is None:
+        st.session_state.score_stats = score_statistics(score_matrix(scenario))
+    return st.session_state.score_stats
 
 def verify_scenario_data(scenario):
     required_columns = [col[0] for col in columns_to_shuffle]
@@ -190,87 +176,11 @@ def verify_scenario_data(scenario):
         return missing_columns
     return []
 
-def get_final_prediction(scenario_df, model):
-    try:
-        if 'Total_Score' not in scenario_df.columns or pd.isna(scenario_df['Total_Score']).all():
-            scenario_df['Total_Score'] = scenario_df[score_columns].sum(axis=1)
-        total_score = scenario_df['Total_Score'].iloc[0]
-        override_decision, override_reason = apply_override_rules(scenario_df.iloc[0])
-        try:
-            model_pred = model.predict(scenario_df)[0]
-            model_label = label_mapping.get(model_pred, "Unknown")
-        except Exception as e:
-            logging.error(f"Error in model prediction: {e}")
-            model_label = None
-        if override_decision:
-            return override_decision, f"OVERRIDE APPLIED: {override_reason}", model_label
-        else:
-            score_based_decision = assign_final_decision(total_score)
-            return score_based_decision, "", model_label
-    except Exception as e:
-        logging.error(f"Error in get_final_prediction: {e}")
-        return None, f"Error in prediction: {e}", None
-
-
-
-def apply_override_rules(row):
-    try:
-        categories = {col: row[col] for col in row.index if not col.endswith('_Score')}
-        if 'Total_Score' not in row or pd.isna(row['Total_Score']):
-            row['Total_Score'] = row[[col for col in row.index if col.endswith('_Score')]].sum()
-            logging.info("Calculated Total_Score in apply_override_rules")
-        if categories['Target_Category'] in ["Chapel", "Medical Installation", "Medical Vehicle"]:
-            return "Do Not Engage", f"Protected Target_Category '{categories['Target_Category']}'"
-        if (categories['Terrain_Type'] in ["Urban Center", "Residential Area"]) and \
-           (categories['Target_Category'] not in ["High-Value Target", "Battalion HQ", "Battlegroup HQ", "Brigade HQ", "Division HQ"]):
-            return "Do Not Engage", f"Non-priority target in {categories['Terrain_Type']}"
-        if categories['Ethical_Concerns'] == 'Immoral' and row['Total_Score'] >= 30:
-            return "Do Not Engage", "Ethical concerns override high score"
-        try:
-            civilian_presence = categories['Civilian_Presence']
-            if isinstance(civilian_presence, str) and '-' in civilian_presence:
-                civilian_presence = int(civilian_presence.split('-')[0])
-            else:
-                civilian_presence = int(civilian_presence)
-            if civilian_presence >= 100:
-                return "Do Not Engage", f"High civilian presence: {categories['Civilian_Presence']}"
-        except (ValueError, TypeError):
-            logging.warning(f"Could not parse Civilian_Presence value: {categories['Civilian_Presence']}")
-        if categories['Collateral_Damage_Potential'] == 'Very_High' and \
-           any(str(categories['Civilian_Presence']).startswith(x) for x in ['50', '100']):
-            return "Do Not Engage", "High collateral damage risk with significant civilian presence"
-        if categories['Friendly_Fire'] == "Very_High" and categories['Collateral_Damage_Potential'] == 'Very_High':
-            return "Do Not Engage", "Multiple high-risk factors present"
-        try:
-            cp_value = categories['Civilian_Presence']
-            if isinstance(cp_value, str) and '-' in cp_value:
-                cp_value = int(cp_value.split('-')[0])
-            else:
-                cp_value = int(cp_value)
-            if cp_value > 30 and categories['Weaponeering'] in ["Incendiary Weapon", "Thermobaric Munition", "White Phosphorus Bomb"]:
-                return "Ask Authorization", "Special weapons with civilian presence > 30"
-        except (ValueError, TypeError):
-            logging.warning(f"Could not parse Civilian_Presence value for special weapons check")
-        if categories['Legal_Advice'] in ['It depends', 'Questionable'] or \
-           (categories['Ethical_Concerns'] == 'Immoral' and cp_value > 50):
-            return "Ask Authorization", "Legal/ethical concerns require authorization"
-        if categories['Politically_Sensitive'] == "High" and categories['Terrain_Type'] == "Critical Infrastructure Area":
-            return "Ask Authorization", "Sensitive infrastructure engagement"
-        if categories['Weaponeering'] == "Anti-Personnel Mine" and \
-           categories['Target_Category'] in ["Fighter Aircraft", "Frigate", "Ship Maintenance Facility", "Naval Base"]:
-            return "Do Not Know", "Inappropriate weapon for target type"
-        if categories['Weaponeering'] == "Torpedo" and \
-           categories['Target_Category'] not in ["Ship Maintenance Facility", "Naval Base", "Frigate"]:
-            return "Do Not Know", "Torpedo inappropriate for non-naval target"
-        return None, "No override rules applied"
-    except KeyError as e:
-        logging.error(f"Missing required column in override rules: {e}")
-        return None, "No override rules applied"
-    except Exception as e:
-        logging.error(f"Unexpected error in apply_override_rules: {e}")
-        return None, "No override rules applied"
-
 def get_google_sheet():
+    # Local file-backed sheet for load tests and development (see load_test.py)
+    stub_path = os.environ.get("STUDY_SHEET_STUB")
+    if stub_path:
+        return LocalSheet(stub_path, latency=float(os.environ.get("STUDY_SHEET_STUB_LATENCY", 0)))
     try:
         # Ensure your secrets are loaded as a dictionary
         creds_dict = dict(st.secrets["gcp_service_account"])
@@ -286,27 +196,39 @@ def get_google_sheet():
         client = gspread.authorize(creds)
         return client.open("Study_data").sheet1
     except Exception as e:
-        st.error(f"Error connecting to Google Sheets: {e}")
+        # Called from the result writer thread, so log rather than st.error
+        logger.error("Error connecting to Google Sheets: %s", e)
         return None
 
-def save_data_to_google_sheet(data):
-    sheet = get_google_sheet()
-    if sheet:
-        try:
-            scenario_details = ", ".join(f"{key}: {value}" for key, value in data.get('scenario', {}).items())
-            row = [
-                scenario_details,
-                data.get('Participant Decision', ''),
-                data.get('Model Prediction', ''),
-                data.get('Decision Time (seconds)', ''),
-                data.get('Confirmation Feedback', ''),
-                data.get('Additional Feedback', ''),
-            ]
-            sheet.append_row(row)
-            logging.info("Data appended to Google Sheets successfully.")
-        except Exception as e:
-            st.error(f"Error saving data to Google Sheets: {e}")
-            logging.error(f"Error saving data to Google Sheets: {e}")
+# Results are logged locally first and flushed to the sheet in the background;
+# the record ID goes in the column after the six data columns.
+RESULT_ID_COLUMN = 7
+
+@st.cache_resource
+def get_result_writer():
+    wal_path = os.environ.get("STUDY_RESULTS_WAL", "results_wal.jsonl")
+    return ResultWriter(wal_path, get_google_sheet, id_column=RESULT_ID_COLUMN)
+
+def save_data_to_google_sheet(data, kind):
+    # One record per scenario and kind ("timeout" or "feedback"), whatever the number of reruns
+    record_id = make_record_id(st.session_state.session_id, st.session_state.scenario_count, kind)
+    scenario_details = ", ".join(f"{key}: {value}" for key, value in data.get('scenario', {}).items())
+    row = [
+        scenario_details,
+        data.get('Participant Decision', ''),
+        data.get('Model Prediction', ''),
+        data.get('Decision Time (seconds)', ''),
+        data.get('Confirmation Feedback', ''),
+        data.get('Additional Feedback', ''),
+    ]
+    try:
+        if get_result_writer().submit(record_id, row):
+            logger.info("Result %s logged for Google Sheets.", record_id)
+        else:
+            logger.info("Result %s already submitted, skipping duplicate.", record_id)
+    except Exception as e:
+        st.error(f"Error saving data: {e}")
+        logger.error("Error writing result %s to the results log: %s", record_id, e)
 
 def display_scenario_with_scores(scenario, feature_importances=None, override_reason=None):
     columns_to_display = [col[0] for col in columns_to_shuffle]
@@ -319,12 +241,10 @@ def display_scenario_with_scores(scenario, feature_importances=None, override_re
                 </div>
             """, unsafe_allow_html=True)
     else:
-        scores = {f"{col}_Score": scenario[f"{col}_Score"] for col in columns_to_display if f"{col}_Score" in scenario}
-        percentages = calculate_percentages(scores)
-        for score_col, score_val in scores.items():
-            pct = percentages.get(score_col, 0)
+        stats = get_score_stats(scenario)
+        for score_col, pct in zip(score_columns, stats["percentages"][0]):
+            score_val = scenario[score_col]
             parameter = score_col.replace('_Score', '')
-            score_display = get_score_display(score_val, pct)
             st.markdown(f"""
                 <div style='display: flex; justify-content: flex-start; align-items: center; margin-bottom: 2px;'>
                     <span style='font-weight: bold; margin-right: 5px; font-size: 20px;'>{parameter}:</span>
@@ -333,84 +253,43 @@ def display_scenario_with_scores(scenario, feature_importances=None, override_re
                 </div>
                 <div class='dotted-line'></div>
             """, unsafe_allow_html=True)
-        total_score = sum(scores.values())
         st.markdown(f"""
             <div style='margin-top: 15px; color: #CC0000; font-weight: bold;'>
-                Total Score: {total_score}
+                Total Score: {stats["totals"][0]}
             </div>
         """, unsafe_allow_html=True)
 
 # ---------------------------
 # Navigation Functions (with updated multi-scenario logic)
 # ---------------------------
+# The transitions themselves live in study_flow, shared with session_replay.py
+def record_event(name, **fields):
+    if st.session_state.event_log is None:
+        return
+    try:
+        st.session_state.event_log.record(name, **fields)
+    except Exception as e:
+        logger.error("Error recording %s event: %s", name, e)
+
+def record_transition(name, from_step):
+    record_event(name, from_step=from_step, to_step=st.session_state.step,
+                 new_step_index=st.session_state.new_step_index, scenario_count=st.session_state.scenario_count)
+
 def next_step():
-    if st.session_state.flow == "original":
-        if st.session_state.step < 9:
-            st.session_state.step += 1
-            logging.info(f"Original flow: Moved to Step {st.session_state.step}")
-        else:
-            # End of scenario in original flow: increment scenario_count
-            st.session_state.scenario_count += 1
-            logging.info(f"Completed scenario {st.session_state.scenario_count - 1} in original flow")
-            if st.session_state.scenario_count > 5:
-                st.session_state.flow = "reordered"
-                st.session_state.new_step_index = 0
-                st.session_state.step = 2
-            else:
-                st.session_state.step = 2
-            reset_scenario_states()
-            st.rerun()
-    else:  # Reordered flow for scenarios 6–10
-        # Updated reorder flow now includes Step 7: [2, 5, 6, 3, 4, 7, 8, 9]
-        reorder_flow = [2, 5, 6, 3, 4, 7, 8, 9]
-        if st.session_state.new_step_index < len(reorder_flow) - 1:
-            st.session_state.new_step_index += 1
-            st.session_state.step = reorder_flow[st.session_state.new_step_index]
-            logging.info(f"Reordered flow: Moved to Step {st.session_state.step} (index {st.session_state.new_step_index})")
-        else:
-            st.session_state.scenario_count += 1
-            logging.info(f"Completed scenario {st.session_state.scenario_count - 1} in reordered flow")
-            if st.session_state.scenario_count > 10:
-                st.info("Study completed. Please refresh the page for the next round.")
-                st.stop()
-            else:
-                st.session_state.new_step_index = 0
-                st.session_state.step = reorder_flow[0]
-            reset_scenario_states()
-            st.rerun()
+    from_step = st.session_state.step
+    outcome = advance(st.session_state)
+    record_transition("next", from_step)
+    if outcome == STUDY_DONE:
+        st.info("Study completed. Please refresh the page for the next round.")
+        st.stop()
+    elif outcome == SCENARIO_DONE:
+        reset_scenario(st.session_state)
+        st.rerun()
 
 def prev_step():
-    if st.session_state.flow == "original":
-        if st.session_state.step > 1:
-            st.session_state.step -= 1
-            st.session_state.timer_active = False
-            st.session_state.time_remaining = 300
-            logging.info(f"Original flow: Moved back to Step {st.session_state.step}")
-    else:
-        reorder_flow = [2, 5, 6, 3, 4, 7, 8, 9]
-        if st.session_state.new_step_index > 0:
-            st.session_state.new_step_index -= 1
-            st.session_state.step = reorder_flow[st.session_state.new_step_index]
-            logging.info(f"Reordered flow: Moved back to Step {st.session_state.step} (index {st.session_state.new_step_index})")
-
-def reset_scenario_states():
-    st.session_state.scenario = None
-    st.session_state.user_decision = None
-    st.session_state.model_prediction_label = None
-    st.session_state.override_reason = None
-    st.session_state.confirmation_feedback = None
-    st.session_state.feedback_shared = False
-    st.session_state.start_time = None
-    st.session_state.decision_time = None
-    st.session_state.submitted_decision = False
-    st.session_state.submitted_feedback = False
-    st.session_state.scenario_generated = False
-    st.session_state.model_generated = False
-    st.session_state.revealed_reasoning = False
-    st.session_state.raw_model_prediction = None
-    st.session_state.time_remaining = 300
-    st.session_state.timer_active = False
-    st.session_state.start = None
+    from_step = st.session_state.step
+    go_back(st.session_state)
+    record_transition("back", from_step)
 
 # ---------------------------
 # Feedback Handling Functions
@@ -428,9 +307,10 @@ def handle_submit_feedback():
             "Confirmation Feedback": st.session_state.confirmation_feedback,
             "Additional Feedback": feedback
         }
-        save_data_to_google_sheet(data)
+        save_data_to_google_sheet(data, "feedback")
+        record_event("feedback", skipped=False, text=feedback)
         st.success("Your responses have been recorded. Thank you!")
-        logging.info("Data saved successfully.")
+        logger.info("Data saved successfully.")
         next_step()
 
 def handle_timeout_decision():
@@ -455,11 +335,16 @@ def handle_skip_feedback():
         "Confirmation Feedback": st.session_state.confirmation_feedback,
         "Additional Feedback": feedback_text
     }
-    save_data_to_google_sheet(data)
+    save_data_to_google_sheet(data, "feedback")
+    record_event("feedback", skipped=True, text=feedback_text)
     st.success("Your responses have been recorded. Thank you!")
-    logging.info("Data saved successfully.")
+    logger.info("Data saved successfully.")
     next_step()
 
+def log_step_entered(step, title):
+    # Logged on every rerun, so sampled by study_logging
+    logger.info("Entered Step %s: %s.", step, title, extra={"event": "step_entered", "step": step})
+
 # ---------------------------
 # Main Application Function
 # ---------------------------
@@ -517,7 +402,6 @@ def main():
 
     # Always show the title and scenario counter at the top
     st.markdown(get_markdown_text("Military Decision-Making App", "header"), unsafe_allow_html=True)
-    logging.info("App started.")
     scenario_num = st.session_state.scenario_count
     st.markdown(f"<h6 style='text-align:center; color:#003366;'>Scenario {scenario_num} of 10</h4>", unsafe_allow_html=True)
     
@@ -525,14 +409,15 @@ def main():
     total_steps = 9
     st.session_state.progress = (st.session_state.step - 1) / (total_steps - 1)
     st.progress(st.session_state.progress)
-    logging.info(f"Progress: {st.session_state.progress}, Step: {st.session_state.step}")
+    logger.info("Rerun at Step %s, progress %s", st.session_state.step, st.session_state.progress,
+                extra={"event": "app_rerun", "step": st.session_state.step})
 
     # ---------------------------
     # Step-based Logic
     # ---------------------------
     # Step 1: Introduction and Scenario Guide (only for scenario 1 in original flow)
     if st.session_state.step == 1 and st.session_state.flow == "original":
-        logging.info("Entered Step 1: Introduction and Scenario Guide.")
+        log_step_entered(1, "Introduction and Scenario Guide")
         st.markdown("<div class='step-title'>Step 1: Introduction</div>", unsafe_allow_html=True)
         st.markdown(get_markdown_text("""
 The App explores human-machine teaming in military contexts.
@@ -659,26 +544,35 @@ The App explores human-machine teaming in military contexts.
 
     # Step 2: Generate Scenario
     elif st.session_state.step == 2:
-        logging.info("Entered Step 2: Generate Scenario.")
+        log_step_entered(2, "Generate Scenario")
         st.markdown("<div class='step-title'>Step 2: Generate Scenario</div>", unsafe_allow_html=True)
         st.markdown(get_markdown_text("<i>Click the button below to generate a new scenario.</i>", "normal_text"), unsafe_allow_html=True)
         generate_button = st.button("Generate Scenario", key="generate_scenario")
         if generate_button:
             try:
-                logging.info("Starting scenario generation")
-                st.session_state.df_shuffled = shuffle_dataset(df)
-                logging.info("Dataset shuffled successfully")
-                st.session_state.scenario = get_random_scenario(st.session_state.df_shuffled)
-                logging.info("Random scenario selected successfully")
+                st.session_state.correlation_id = uuid.uuid4().hex[:12]
+                set_log_context(session=st.session_state.session_id, correlation_id=st.session_state.correlation_id)
+                logger.info("Starting scenario generation")
+                sampler = get_scenario_sampler()
+                if st.session_state.scenario_plan is None:
+                    # Even spread of outcomes and override reasons over the 10 scenarios
+                    st.session_state.scenario_plan = sampler.plan_session(random, 10)
+                plan = st.session_state.scenario_plan
+                outcome, reason = plan[(st.session_state.scenario_count - 1) % len(plan)]
+                st.session_state.scenario = sampler.draw(random, outcome, reason)
+                logger.info("Scenario drawn for outcome '%s', reason '%s'", outcome, reason)
+                st.session_state.score_stats = None
+                stats = get_score_stats(st.session_state.scenario)
                 if 'Total_Score' not in st.session_state.scenario or pd.isna(st.session_state.scenario['Total_Score']):
-                    st.session_state.scenario['Total_Score'] = st.session_state.scenario[score_columns].sum()
-                    logging.info("Calculated Total_Score for the scenario.")
+                    st.session_state.scenario['Total_Score'] = stats["totals"][0]
+                    logger.info("Calculated Total_Score for the scenario.")
+                record_event("scenario", scenario=st.session_state.scenario)
                 st.session_state.start_time = time.time()
                 st.session_state.scenario_generated = True
                 st.success("Scenario generated successfully!")
-                logging.info("Generated new scenario.")
+                logger.info("Generated new scenario.")
             except Exception as e:
-                logging.error(f"Error in scenario generation: {e}")
+                logger.error("Error in scenario generation: %s", e)
                 st.error(f"Failed to generate scenario: {e}")
         col_back, col_next = st.columns(2)
         with col_back:
@@ -691,7 +585,7 @@ The App explores human-machine teaming in military contexts.
 
     # Step 3: Review Scenario
     elif st.session_state.step == 3:
-        logging.info("Entered Step 3: Review Scenario.")
+        log_step_entered(3, "Review Scenario")
         st.markdown("<div class='step-title'>Step 3: Review Scenario</div>", unsafe_allow_html=True)
         display_scenario_with_scores(st.session_state.scenario)
         st.markdown("<div style='height: 20px;'></div>", unsafe_allow_html=True)
@@ -703,7 +597,7 @@ The App explores human-machine teaming in military contexts.
 
     # Step 4: Submit Decision
     elif st.session_state.step == 4:
-        logging.info("Entered Step 4: Submit Decision.")
+        log_step_entered(4, "Submit Decision")
         st.markdown(get_markdown_text("<i>Please review the scenario and select your decision below.</i>", "normal_text"), unsafe_allow_html=True)
         if not st.session_state.timer_active:
             st.session_state.time_remaining = 300
@@ -742,46 +636,60 @@ The App explores human-machine teaming in military contexts.
                         st.session_state.decision_time = 300
                     st.session_state.submitted_decision = True
                     st.session_state.timer_active = False
+                    record_event("decision", decision=st.session_state.user_decision, decision_time=st.session_state.decision_time)
                     st.success("Decision submitted successfully!")
         if st.session_state.submitted_decision:
             st.button("Next", key="next_step4", on_click=next_step)
         if st.session_state.timer_active and st.session_state.time_remaining > 0:
             time.sleep(1)
             st.session_state.time_remaining -= 1
+            record_event("tick", time_remaining=st.session_state.time_remaining)
             if st.session_state.time_remaining == 0:
                 if not st.session_state.submitted_decision:
                     data = handle_timeout_decision()
-                    save_data_to_google_sheet(data)
+                    save_data_to_google_sheet(data, "timeout")
                     st.warning("Time's up! Decision auto-submitted.")
                     st.session_state.submitted_decision = True
                     st.session_state.timer_active = False
-                st.session_state.step += 1
+                from_step = st.session_state.step
+                expire_timer(st.session_state)
+                record_transition("timeout", from_step)
             st.rerun()
 
     # Step 5: Generate Model Prediction
     elif st.session_state.step == 5:
-        logging.info("Entered Step 5: Generate Model Prediction.")
+        log_step_entered(5, "Generate Model Prediction")
         st.markdown("<div class='step-title'>Step 5: Generate Model Prediction</div>", unsafe_allow_html=True)
         st.write(get_markdown_text(f"<b>Your Decision</b>: {st.session_state.user_decision}", "decision_text"), unsafe_allow_html=True)
         generate_prediction = st.button("Generate Model Prediction", key="generate_prediction")
         if generate_prediction:
             try:
                 scenario_data = pd.DataFrame([{col: st.session_state.scenario[col] for col in trained_feature_columns}])
-                final_decision, reason, raw_model_pred = get_final_prediction(scenario_data, rf_model_loaded)
+                score_stats = get_score_stats(st.session_state.scenario)
+                cpu_start = time.thread_time()
+                prediction_start = time.perf_counter()
+                final_decision, reason, raw_model_pred = get_final_prediction(scenario_data, rf_model_loaded, score_stats)
+                production_timing = (time.perf_counter() - prediction_start, time.thread_time() - cpu_start)
+                shadow = get_shadow_evaluator()
+                if shadow is not None:
+                    shadow.submit(make_record_id(st.session_state.session_id, st.session_state.scenario_count, "shadow"),
+                                  st.session_state.scenario.copy(), score_stats,
+                                  (final_decision, reason, raw_model_pred), production_timing)
                 if final_decision:
                     st.session_state.model_prediction_label = final_decision
                     st.session_state.override_reason = reason
                     st.session_state.raw_model_prediction = raw_model_pred
                     st.session_state.model_generated = True
+                    record_event("prediction", final_decision=final_decision, reason=reason, raw_prediction=raw_model_pred)
                     st.success("Model prediction generated!")
                     st.write(get_markdown_text(f"<b>Model Decision</b>: {final_decision}", "decision_text"), unsafe_allow_html=True)
-                    logging.info(f"Model prediction generated - Final: {final_decision}, Reason: {reason}")
+                    logger.info("Model prediction generated - Final: %s, Reason: %s", final_decision, reason)
                 else:
                     st.error("Could not generate prediction")
             except Exception as e:
                 st.error(f"An error occurred during model prediction: {e}")
                 st.write("Error details:", str(e))
-                logging.error(f"Exception in Step 5: {e}")
+                logger.error("Exception in Step 5: %s", e)
         col_back, col_next = st.columns(2)
         with col_back:
             st.button("Back", key="back_step5", on_click=prev_step)
@@ -793,7 +701,7 @@ The App explores human-machine teaming in military contexts.
 
     # Step 6: Reveal Model Reasoning
     elif st.session_state.step == 6:
-        logging.info("Entered Step 6: Reveal Model Reasoning.")
+        log_step_entered(6, "Reveal Model Reasoning")
         st.markdown("<div class='step-title'>Step 6: Reveal Model Reasoning</div>", unsafe_allow_html=True)
         st.markdown(f"""
             <div style='color: #003366; font-size: 20px; margin-bottom: 20px;'>
@@ -867,14 +775,15 @@ The App explores human-machine teaming in military contexts.
             if submit_feedback and confirmation_feedback:
                 st.session_state.confirmation_feedback = confirmation_feedback
                 st.session_state.submitted_feedback = True
+                record_event("confirmation", feedback=confirmation_feedback)
                 st.success("Thank you for your feedback!")
-                logging.info(f"User feedback submitted: {confirmation_feedback}")
+                logger.info("User feedback submitted: %s", confirmation_feedback)
         if st.session_state.submitted_feedback:
             st.button("Next", key="next_step7", on_click=next_step)
 
     # Step 8: Share Additional Feedback
     elif st.session_state.step == 8:
-        logging.info("Entered Step 8: Share Additional Feedback.")
+        log_step_entered(8, "Share Additional Feedback")
         st.markdown("<div class='step-title'>Step 8: Share Additional Feedback</div>", unsafe_allow_html=True)
         st.markdown(get_markdown_text("Please provide any additional thoughts or comments below.", "normal_text"), unsafe_allow_html=True)
         st.text_area("", key="feedback_box", help="Share any additional thoughts or comments.")
@@ -887,23 +796,19 @@ The App explores human-machine teaming in military contexts.
 
     # Step 9: Completion – update scenario counter here
     elif st.session_state.step == 9:
-        logging.info("Entered Step 9: Completion.")
+        log_step_entered(9, "Completion")
         st.markdown(get_markdown_text("You have completed all steps for this scenario.", "subheader"), unsafe_allow_html=True)
         st.write("Thank you for participating in this scenario.")
         message_placeholder = st.empty()
         if st.button("Start New Scenario", key="start_new_scenario_button"):
-            st.session_state.scenario_count += 1
-            if st.session_state.scenario_count > 10:
+            from_step = st.session_state.step
+            outcome = start_new_scenario(st.session_state)
+            record_transition("new_scenario", from_step)
+            if outcome == STUDY_DONE:
                 st.info("Study completed. Please refresh the page for the next round.")
                 st.stop()
             else:
-                if st.session_state.scenario_count <= 5:
-                    st.session_state.flow = "original"
-                else:
-                    st.session_state.flow = "reordered"
-                    st.session_state.new_step_index = 0
-                st.session_state.step = 2
-                reset_scenario_states()
+                reset_scenario(st.session_state)
                 st.rerun()
     else:
         st.markdown("Other steps here...")
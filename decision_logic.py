@@ -0,0 +1,187 @@
+"""Scenario columns, score bands, override rules and the final prediction shared by the app and its tools.
+
+Kept free of Streamlit so offline tools can import it without starting a page.
+"""
+import numpy as np
+import pandas as pd
+
+from study_logging import get_logger
+
+logger = get_logger("decision_logic")
+
+
+# ---------------------------
+# Data Columns
+# ---------------------------
+columns_to_shuffle = [
+    ['Target_Category', 'Target_Category_Score'],
+    ['Target_Vulnerability', 'Target_Vulnerability_Score'],
+    ['Terrain_Type', 'Terrain_Type_Score'],
+    ['Civilian_Presence', 'Civilian_Presence_Score'],
+    ['Damage_Assessment', 'Damage_Assessment_Score'],
+    ['Time_Sensitivity', 'Time_Sensitivity_Score'],
+    ['Weaponeering', 'Weaponeering_Score'],
+    ['Friendly_Fire', 'Friendly_Fire_Score'],
+    ['Politically_Sensitive', 'Politically_Sensitive_Score'],
+    ['Legal_Advice', 'Legal_Advice_Score'],
+    ['Ethical_Concerns', 'Ethical_Concerns_Score'],
+    ['Collateral_Damage_Potential', 'Collateral_Damage_Potential_Score'],
+    ['AI_Distinction (%)', 'AI_Distinction (%)_Score'],
+    ['AI_Proportionality (%)', 'AI_Proportionality (%)_Score'],
+    ['AI_Military_Necessity', 'AI_Military_Necessity_Score'],
+    ['Human_Distinction (%)', 'Human_Distinction (%)_Score'],
+    ['Human_Proportionality (%)', 'Human_Proportionality (%)_Score'],
+    ['Human_Military_Necessity', 'Human_Military_Necessity_Score']
+]
+score_columns = [pair[1] for pair in columns_to_shuffle]
+label_mapping = {
+    0: 'Do Not Engage',
+    1: 'Ask Authorization',
+    2: 'Do Not Know',
+    3: 'Engage'
+}
+
+# ---------------------------
+# Decision Logic
+# ---------------------------
+# Lower bounds of the score bands, checked from the top
+decision_thresholds = {
+    'Engage': 30,
+    'Ask Authorization': 22.5,
+    'Do Not Know': 15
+}
+
+def assign_final_decision(total_score, thresholds=decision_thresholds):
+    if total_score >= thresholds['Engage']:
+        return 'Engage'
+    elif total_score >= thresholds['Ask Authorization']:
+        return 'Ask Authorization'
+    elif total_score >= thresholds['Do Not Know']:
+        return 'Do Not Know'
+    else:
+        return 'Do Not Engage'
+
+def apply_override_rules(row):
+    """First override rule that fires for a full scenario row (a Series or dict) as (decision, reason)."""
+    try:
+        categories = {col: row[col] for col in row.keys() if not col.endswith('_Score')}
+        if 'Total_Score' not in row or pd.isna(row['Total_Score']):
+            row['Total_Score'] = score_totals(score_matrix(row))[0]
+            logger.info("Calculated Total_Score in apply_override_rules")
+        if categories['Target_Category'] in ["Chapel", "Medical Installation", "Medical Vehicle"]:
+            return "Do Not Engage", f"Protected Target_Category '{categories['Target_Category']}'"
+        if (categories['Terrain_Type'] in ["Urban Center", "Residential Area"]) and \
+           (categories['Target_Category'] not in ["High-Value Target", "Battalion HQ", "Battlegroup HQ", "Brigade HQ", "Division HQ"]):
+            return "Do Not Engage", f"Non-priority target in {categories['Terrain_Type']}"
+        if categories['Ethical_Concerns'] == 'Immoral' and row['Total_Score'] >= 30:
+            return "Do Not Engage", "Ethical concerns override high score"
+        try:
+            civilian_presence = categories['Civilian_Presence']
+            if isinstance(civilian_presence, str) and '-' in civilian_presence:
+                civilian_presence = int(civilian_presence.split('-')[0])
+            else:
+                civilian_presence = int(civilian_presence)
+            if civilian_presence >= 100:
+                return "Do Not Engage", f"High civilian presence: {categories['Civilian_Presence']}"
+        except (ValueError, TypeError):
+            logger.warning("Could not parse Civilian_Presence value: %s", categories['Civilian_Presence'])
+        if categories['Collateral_Damage_Potential'] == 'Very_High' and \
+           any(str(categories['Civilian_Presence']).startswith(x) for x in ['50', '100']):
+            return "Do Not Engage", "High collateral damage risk with significant civilian presence"
+        if categories['Friendly_Fire'] == "Very_High" and categories['Collateral_Damage_Potential'] == 'Very_High':
+            return "Do Not Engage", "Multiple high-risk factors present"
+        try:
+            cp_value = categories['Civilian_Presence']
+            if isinstance(cp_value, str) and '-' in cp_value:
+                cp_value = int(cp_value.split('-')[0])
+            else:
+                cp_value = int(cp_value)
+            if cp_value > 30 and categories['Weaponeering'] in ["Incendiary Weapon", "Thermobaric Munition", "White Phosphorus Bomb"]:
+                return "Ask Authorization", "Special weapons with civilian presence > 30"
+        except (ValueError, TypeError):
+            logger.warning("Could not parse Civilian_Presence value for special weapons check")
+        if categories['Legal_Advice'] in ['It depends', 'Questionable'] or \
+           (categories['Ethical_Concerns'] == 'Immoral' and cp_value > 50):
+            return "Ask Authorization", "Legal/ethical concerns require authorization"
+        if categories['Politically_Sensitive'] == "High" and categories['Terrain_Type'] == "Critical Infrastructure Area":
+            return "Ask Authorization", "Sensitive infrastructure engagement"
+        if categories['Weaponeering'] == "Anti-Personnel Mine" and \
+           categories['Target_Category'] in ["Fighter Aircraft", "Frigate", "Ship Maintenance Facility", "Naval Base"]:
+            return "Do Not Know", "Inappropriate weapon for target type"
+        if categories['Weaponeering'] == "Torpedo" and \
+           categories['Target_Category'] not in ["Ship Maintenance Facility", "Naval Base", "Frigate"]:
+            return "Do Not Know", "Torpedo inappropriate for non-naval target"
+        return None, "No override rules applied"
+    except KeyError as e:
+        logger.error("Missing required column in override rules: %s", e)
+        return None, "No override rules applied"
+    except Exception as e:
+        logger.error("Unexpected error in apply_override_rules: %s", e)
+        return None, "No override rules applied"
+
+
+# ---------------------------
+# Score Statistics
+# ---------------------------
+def score_matrix(scenarios):
+    """(N, 18) score array from a scenario DataFrame, or (1, 18) from a single scenario row."""
+    if isinstance(scenarios, pd.Series):
+        return pd.to_numeric(scenarios[score_columns]).to_numpy()[np.newaxis]
+    return scenarios[score_columns].to_numpy()
+
+def score_totals(scores):
+    return np.asarray(scores).sum(axis=1)
+
+def score_band_codes(totals, thresholds=decision_thresholds):
+    """Vectorized assign_final_decision, as label_mapping codes."""
+    codes = {label: code for code, label in label_mapping.items()}
+    totals = np.asarray(totals)
+    return np.select(
+        [totals >= thresholds['Engage'], totals >= thresholds['Ask Authorization'], totals >= thresholds['Do Not Know']],
+        [codes['Engage'], codes['Ask Authorization'], codes['Do Not Know']],
+        default=codes['Do Not Engage']
+    ).astype(np.int8)
+
+def score_statistics(scores, thresholds=decision_thresholds):
+    """Totals, signed percentage contributions and score bands for an (N, 18) score matrix.
+
+    A score's percentage is its share of the summed absolute scores, rounded
+    to two decimals and negative for negative scores (0 when all scores are 0).
+    """
+    scores = np.asarray(scores)
+    totals = score_totals(scores)
+    magnitudes = np.abs(scores).astype(float)
+    abs_totals = magnitudes.sum(axis=1, keepdims=True)
+    shares = np.divide(magnitudes, abs_totals, out=np.zeros_like(magnitudes), where=abs_totals > 0)
+    percentages = np.round(shares * 100, 2) * np.where(scores >= 0, 1, -1)
+    return {
+        "totals": totals,
+        "percentages": percentages,
+        "bands": score_band_codes(totals, thresholds),
+    }
+
+
+# ---------------------------
+# Final Prediction
+# ---------------------------
+def get_final_prediction(scenario_df, model, score_stats=None):
+    try:
+        if score_stats is None:
+            score_stats = score_statistics(score_matrix(scenario_df))
+        if 'Total_Score' not in scenario_df.columns or pd.isna(scenario_df['Total_Score']).all():
+            scenario_df['Total_Score'] = score_stats["totals"]
+        override_decision, override_reason = apply_override_rules(scenario_df.iloc[0])
+        try:
+            model_pred = model.predict(scenario_df)[0]
+            model_label = label_mapping.get(model_pred, "Unknown")
+        except Exception as e:
+            logger.error("Error in model prediction: %s", e)
+            model_label = None
+        if override_decision:
+            return override_decision, f"OVERRIDE APPLIED: {override_reason}", model_label
+        else:
+            score_based_decision = label_mapping[score_stats["bands"][0]]
+            return score_based_decision, "", model_label
+    except Exception as e:
+        logger.error("Error in get_final_prediction: %s", e)
+        return None, f"Error in prediction: {e}", None
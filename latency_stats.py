@@ -0,0 +1,11 @@
+"""Latency summaries shared by the load test, session replay and shadow evaluation."""
+import math
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of values; 0.0 when there are none."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
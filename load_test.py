@@ -0,0 +1,246 @@
+"""Load generator emulating simultaneous study participants.
+
+Each participant runs in its own process and drives app_main.py through
+Streamlit's AppTest harness, clicking through the same steps a participant
+does. Google Sheets writes go to a local LocalSheet file instead.
+
+    python load_test.py --participants 30 --scenarios 2 --think-time 1.5
+    python load_test.py --participants 30 --lockstep   # hit Steps 2 and 4 together
+
+Step 4 reruns itself every second until its timer stops, and AppTest can
+only click a button once a run has finished, so participants spend
+--decision-ticks timer ticks on Step 4 and then take the timeout path
+(which also saves a result). The reported Step 4 latency excludes the
+one-second sleeps of those ticks.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from latency_stats import percentile
+from result_log import read_log
+from sheets_stub import LocalSheet
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, "app_main.py")
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        import resource
+        # Peak rather than current RSS where /proc is unavailable
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_participant(index, options, barrier, results):
+    from streamlit.testing.v1 import AppTest
+
+    # Each participant process gets its own results log, as a server process would
+    wal_path = f"{os.environ['STUDY_SHEET_STUB']}.{index}.wal"
+    os.environ["STUDY_RESULTS_WAL"] = wal_path
+    rng = random.Random(options["seed"] + index)
+    ticks = options["decision_ticks"]
+    records = []
+    at = AppTest.from_file(APP_PATH, default_timeout=ticks + 60)
+
+    def request(label, action, wait=0.0):
+        cpu = time.process_time()
+        start = time.perf_counter()
+        action()
+        at.run()
+        records.append({
+            "participant": index,
+            "label": label,
+            "latency": time.perf_counter() - start - wait,
+            "cpu": time.process_time() - cpu,
+            "rss_mb": current_rss_mb(),
+        })
+        if at.exception:
+            raise RuntimeError(f"{label}: {at.exception[0].message}")
+
+    def click(key):
+        return lambda: at.button(key=key).click()
+
+    def sync():
+        if barrier is not None:
+            try:
+                barrier.wait(timeout=options["barrier_timeout"])
+            except threading.BrokenBarrierError:
+                pass
+
+    def think():
+        if options["think_time"]:
+            time.sleep(rng.uniform(0.5, 1.5) * options["think_time"])
+
+    def answer_confirmation():
+        at.radio(key="confirmation_feedback_radio").set_value("Agree")
+        at.button(key="submit_feedback").click()
+
+    def answer_feedback():
+        at.text_area(key="feedback_box").input(f"load test participant {index}")
+        at.button(key="submit_feedback_additional").click()
+
+    error = None
+    try:
+        time.sleep(options["ramp_up"] * index / max(options["participants"], 1))
+        request("load", lambda: None)
+        max_requests = options["scenarios"] * 20 + 5
+        while at.session_state["scenario_count"] <= options["scenarios"]:
+            if len(records) >= max_requests:
+                raise RuntimeError(f"no progress after {len(records)} requests (step {at.session_state['step']})")
+            step = at.session_state["step"]
+            think()
+            if step == 1:
+                request("step 1", click("proceed_to_scenario_generation"))
+            elif step == 2:
+                if not at.session_state["scenario_generated"]:
+                    sync()
+                    request("step 2 generate", click("generate_scenario"))
+                request("step 2 next", click("next_step2"))
+            elif step == 3:
+                # Enter Step 4 with a short timer; it ticks, times out and saves
+                at.session_state["timer_active"] = True
+                at.session_state["time_remaining"] = ticks
+                at.session_state["start"] = time.time()
+                sync()
+                request("step 4 timer", click("proceed_to_decision_step3"), wait=float(ticks))
+            elif step == 5:
+                if not at.session_state["model_generated"]:
+                    request("step 5 predict", click("generate_prediction"))
+                request("step 5 next", click("next_step5"))
+            elif step == 6:
+                request("step 6", click("next_step6"))
+            elif step == 7:
+                request("step 7 submit", answer_confirmation)
+                request("step 7 next", click("next_step7"))
+            elif step == 8:
+                request("step 8 submit", answer_feedback)
+            elif step == 9:
+                request("step 9", click("start_new_scenario_button"))
+            else:
+                raise RuntimeError(f"unexpected step {step}")
+
+        # Sheet writes happen behind the request path; time how long they lag
+        start = time.perf_counter()
+        while read_log(wal_path)[1] and time.perf_counter() - start < options["flush_timeout"]:
+            time.sleep(0.05)
+        records.append({
+            "participant": index,
+            "label": "results flushed",
+            "latency": time.perf_counter() - start,
+            "cpu": 0.0,
+            "rss_mb": current_rss_mb(),
+        })
+        if read_log(wal_path)[1]:
+            raise RuntimeError(f"results still unflushed after {options['flush_timeout']}s")
+    except Exception as e:
+        error = f"participant {index}: {e}"
+        if barrier is not None:
+            barrier.abort()
+    results.put((index, records, error))
+
+
+def summarize(records, wall_time, errors, sheet_path):
+    labels = list(dict.fromkeys(record["label"] for record in records))
+    print(f"{'request':<18}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'cpu ms':>10}{'rss MB':>9}")
+    summary = {}
+    for label in labels:
+        rows = [record for record in records if record["label"] == label]
+        latencies = [record["latency"] * 1000 for record in rows]
+        summary[label] = {
+            "count": len(rows),
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": max(latencies),
+            "cpu_ms": sum(record["cpu"] for record in rows) / len(rows) * 1000,
+            "rss_mb": max(record["rss_mb"] for record in rows),
+        }
+        s = summary[label]
+        print(f"{label:<18}{s['count']:>7}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}"
+              f"{s['max_ms']:>10.1f}{s['cpu_ms']:>10.1f}{s['rss_mb']:>9.1f}")
+
+    sheet_rows = LocalSheet(sheet_path).row_count
+    print(f"\nRequests: {len(records)} in {wall_time:.1f}s ({len(records) / wall_time:.1f} req/s)")
+    print(f"Sheet rows written: {sheet_rows} ({sheet_rows / wall_time:.2f} rows/s) to {sheet_path}")
+    if errors:
+        print(f"\n{len(errors)} participant(s) failed:")
+        for error in errors:
+            print(f"  {error}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive app_main.py with N concurrent participants.")
+    parser.add_argument("--participants", type=int, default=10)
+    parser.add_argument("--scenarios", type=int, default=1, help="scenarios per participant (1-10)")
+    parser.add_argument("--think-time", type=float, default=1.0, help="mean seconds between clicks")
+    parser.add_argument("--decision-ticks", type=int, default=3, help="Step 4 timer ticks before timeout")
+    parser.add_argument("--lockstep", action="store_true", help="start Steps 2 and 4 at the same moment")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds over which participants start")
+    parser.add_argument("--sheet-path", help="LocalSheet file (default: a temporary file)")
+    parser.add_argument("--sheet-latency", type=float, default=0.2, help="emulated Sheets API latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write raw request records and the summary to this file")
+    args = parser.parse_args()
+
+    if args.decision_ticks < 1:
+        parser.error("--decision-ticks must be at least 1")
+    sheet_path = args.sheet_path
+    if not sheet_path:
+        fd, sheet_path = tempfile.mkstemp(prefix="study_data_", suffix=".csv")
+        os.close(fd)
+    os.environ["STUDY_SHEET_STUB"] = sheet_path
+    os.environ["STUDY_SHEET_STUB_LATENCY"] = str(args.sheet_latency)
+    # Session event logs, replayable with session_replay.py
+    os.environ.setdefault("STUDY_EVENT_LOG_DIR", f"{sheet_path}.events")
+    os.chdir(APP_DIR)
+
+    options = {
+        "participants": args.participants,
+        "scenarios": min(max(args.scenarios, 1), 10),
+        "think_time": args.think_time,
+        "decision_ticks": args.decision_ticks,
+        "ramp_up": args.ramp_up,
+        "seed": args.seed,
+        "barrier_timeout": args.decision_ticks + 120,
+        "flush_timeout": 60,
+    }
+    barrier = multiprocessing.Barrier(args.participants) if args.lockstep else None
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=run_participant, args=(index, options, barrier, results))
+        for index in range(args.participants)
+    ]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    records, errors = [], []
+    for _ in processes:
+        _, participant_records, error = results.get()
+        records.extend(participant_records)
+        if error:
+            errors.append(error)
+    wall_time = time.perf_counter() - start
+    for process in processes:
+        process.join()
+
+    summary = summarize(records, wall_time, errors, sheet_path)
+    print(f"Session event logs: {os.environ['STUDY_EVENT_LOG_DIR']}")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"summary": summary, "records": records, "errors": errors}, fh, indent=2)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,382 @@
+"""Bulk what-if evaluation of decision policies over a scenario table.
+
+A policy is a dict with a ``name``, score band ``thresholds`` (the keys of
+decision_logic.decision_thresholds), the ``ethical_override_score`` used by
+the ethical-concerns rule and a list of ``disabled_rules`` (see
+override_rule_names). Omitted keys fall back to the production values.
+
+Override rules are evaluated once per distinct value of each column and
+mapped back through the column codes. Each distinct set of override rules
+then costs one NumPy pass over the table, run in parallel on a thread pool;
+threshold variants are applied to a histogram over the few hundred distinct
+Total_Score values, so they cost almost nothing per policy.
+
+    from policy_sweep import evaluate_policies
+    summary = evaluate_policies(scenarios, [{"name": "engage@28", "thresholds": {"Engage": 28}}])
+
+    python policy_sweep.py --generate 1000000 --engage 26,28,30,32 --ask 20,22.5 --unknown 12,15
+    python policy_sweep.py --scenarios table.csv --policies policies.json --output deltas.csv
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from decision_logic import (
+    columns_to_shuffle, label_mapping, decision_thresholds,
+    score_band_codes, score_matrix, score_totals
+)
+
+decision_codes = {label: code for code, label in label_mapping.items()}
+DO_NOT_ENGAGE = decision_codes['Do Not Engage']
+ASK_AUTHORIZATION = decision_codes['Ask Authorization']
+DO_NOT_KNOW = decision_codes['Do Not Know']
+ENGAGE = decision_codes['Engage']
+
+DEFAULT_POLICY = {
+    "name": "baseline",
+    "thresholds": dict(decision_thresholds),
+    "ethical_override_score": 30,
+    "disabled_rules": [],
+}
+
+# Same order as apply_override_rules; the first rule that fires decides.
+# "civilian_presence_error" stands for apply_override_rules raising on an
+# unparseable Civilian_Presence, which makes it return no override.
+override_rule_names = [
+    "protected_target",
+    "non_priority_target_in_populated_area",
+    "ethical_concerns_high_score",
+    "high_civilian_presence",
+    "collateral_damage_with_civilians",
+    "multiple_high_risk_factors",
+    "special_weapons_with_civilians",
+    "civilian_presence_error",
+    "legal_ethical_concerns",
+    "sensitive_infrastructure",
+    "inappropriate_weapon_for_target",
+    "torpedo_non_naval_target",
+]
+override_rule_decisions = {
+    "protected_target": DO_NOT_ENGAGE,
+    "non_priority_target_in_populated_area": DO_NOT_ENGAGE,
+    "ethical_concerns_high_score": DO_NOT_ENGAGE,
+    "high_civilian_presence": DO_NOT_ENGAGE,
+    "collateral_damage_with_civilians": DO_NOT_ENGAGE,
+    "multiple_high_risk_factors": DO_NOT_ENGAGE,
+    "special_weapons_with_civilians": ASK_AUTHORIZATION,
+    "civilian_presence_error": None,
+    "legal_ethical_concerns": ASK_AUTHORIZATION,
+    "sensitive_infrastructure": ASK_AUTHORIZATION,
+    "inappropriate_weapon_for_target": DO_NOT_KNOW,
+    "torpedo_non_naval_target": DO_NOT_KNOW,
+}
+# Reason text apply_override_rules returns for each rule, matched as a prefix
+override_rule_reasons = {
+    "protected_target": "Protected Target_Category",
+    "non_priority_target_in_populated_area": "Non-priority target in",
+    "ethical_concerns_high_score": "Ethical concerns override high score",
+    "high_civilian_presence": "High civilian presence",
+    "collateral_damage_with_civilians": "High collateral damage risk",
+    "multiple_high_risk_factors": "Multiple high-risk factors present",
+    "special_weapons_with_civilians": "Special weapons with civilian presence",
+    "legal_ethical_concerns": "Legal/ethical concerns require authorization",
+    "sensitive_infrastructure": "Sensitive infrastructure engagement",
+    "inappropriate_weapon_for_target": "Inappropriate weapon for target type",
+    "torpedo_non_naval_target": "Torpedo inappropriate for non-naval target",
+}
+
+
+def override_rule_for_reason(reason):
+    for name, prefix in override_rule_reasons.items():
+        if reason.startswith(prefix):
+            return name
+    raise ValueError(f"Unrecognised override reason {reason!r}; add it to override_rule_reasons")
+
+
+# ---------------------------
+# Scenario Tables
+# ---------------------------
+def generate_scenarios(df, n, seed=None):
+    """Draw n scenarios the way shuffle_dataset does: each column pair independently."""
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for related_columns in columns_to_shuffle:
+        rows = rng.integers(0, len(df), n)
+        for column in related_columns:
+            columns[column] = df[column].to_numpy()[rows]
+    scenarios = pd.DataFrame(columns)
+    scenarios['Total_Score'] = score_totals(score_matrix(scenarios))
+    return scenarios
+
+
+def load_scenarios(path):
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def _value_mask(column, predicate):
+    """Evaluate predicate once per distinct value and broadcast it through the codes."""
+    codes, uniques = pd.factorize(column, use_na_sentinel=False)
+    lookup = np.fromiter((predicate(value) for value in uniques), dtype=bool, count=len(uniques))
+    return lookup[codes]
+
+
+def _parse_civilian_presence(value):
+    """Mirror the int() parsing in apply_override_rules.
+
+    Returns (presence, raises) where presence is NaN when parsing fails and
+    raises tells whether the later ``cp_value > 50`` comparison would throw,
+    which happens when the unparsed value is not a number.
+    """
+    try:
+        if isinstance(value, str) and '-' in value:
+            return int(value.split('-')[0]), False
+        return int(value), False
+    except (ValueError, TypeError):
+        return np.nan, not isinstance(value, (int, float, np.number))
+
+
+def prepare_scenarios(scenarios):
+    """Precompute everything about a scenario table that no policy can change."""
+    if 'Total_Score' in scenarios and not scenarios['Total_Score'].isna().any():
+        totals = scenarios['Total_Score'].to_numpy(dtype=float)
+    else:
+        totals = score_totals(score_matrix(scenarios)).astype(float)
+
+    target = scenarios['Target_Category']
+    terrain = scenarios['Terrain_Type']
+    civilians = scenarios['Civilian_Presence']
+    weapon = scenarios['Weaponeering']
+    collateral_very_high = _value_mask(scenarios['Collateral_Damage_Potential'], lambda v: v == 'Very_High')
+    immoral = _value_mask(scenarios['Ethical_Concerns'], lambda v: v == 'Immoral')
+
+    codes, uniques = pd.factorize(civilians, use_na_sentinel=False)
+    parsed = [_parse_civilian_presence(value) for value in uniques]
+    presence = np.array([value for value, _ in parsed], dtype=float)[codes]
+    comparison_raises = np.array([raises for _, raises in parsed], dtype=bool)[codes]
+    with np.errstate(invalid='ignore'):
+        legal = _value_mask(scenarios['Legal_Advice'], lambda v: v in ['It depends', 'Questionable'])
+        masks = {
+            "protected_target": _value_mask(
+                target, lambda v: v in ["Chapel", "Medical Installation", "Medical Vehicle"]),
+            "non_priority_target_in_populated_area":
+                _value_mask(terrain, lambda v: v in ["Urban Center", "Residential Area"])
+                & _value_mask(target, lambda v: v not in [
+                    "High-Value Target", "Battalion HQ", "Battlegroup HQ", "Brigade HQ", "Division HQ"]),
+            "high_civilian_presence": presence >= 100,
+            "collateral_damage_with_civilians": collateral_very_high & _value_mask(
+                civilians, lambda v: any(str(v).startswith(x) for x in ['50', '100'])),
+            "multiple_high_risk_factors": collateral_very_high & _value_mask(
+                scenarios['Friendly_Fire'], lambda v: v == "Very_High"),
+            "special_weapons_with_civilians": (presence > 30) & _value_mask(
+                weapon, lambda v: v in ["Incendiary Weapon", "Thermobaric Munition", "White Phosphorus Bomb"]),
+            "civilian_presence_error": ~legal & immoral & comparison_raises,
+            "legal_ethical_concerns": legal | (immoral & (presence > 50)),
+            "sensitive_infrastructure":
+                _value_mask(scenarios['Politically_Sensitive'], lambda v: v == "High")
+                & _value_mask(terrain, lambda v: v == "Critical Infrastructure Area"),
+            "inappropriate_weapon_for_target":
+                _value_mask(weapon, lambda v: v == "Anti-Personnel Mine")
+                & _value_mask(target, lambda v: v in [
+                    "Fighter Aircraft", "Frigate", "Ship Maintenance Facility", "Naval Base"]),
+            "torpedo_non_naval_target":
+                _value_mask(weapon, lambda v: v == "Torpedo")
+                & _value_mask(target, lambda v: v not in ["Ship Maintenance Facility", "Naval Base", "Frigate"]),
+        }
+    total_codes, unique_totals = pd.factorize(totals, sort=True)
+    return {
+        "totals": totals,
+        "total_codes": total_codes,
+        "unique_totals": unique_totals,
+        "immoral": immoral,
+        "masks": masks,
+    }
+
+
+# ---------------------------
+# Policy Evaluation
+# ---------------------------
+def resolve_policy(policy):
+    resolved = dict(DEFAULT_POLICY, **policy)
+    resolved["thresholds"] = dict(DEFAULT_POLICY["thresholds"], **policy.get("thresholds", {}))
+    unknown = set(resolved["disabled_rules"]) - set(override_rule_names)
+    if unknown:
+        raise ValueError(f"Unknown override rules in policy {resolved['name']!r}: {sorted(unknown)}")
+    return resolved
+
+
+def override_outcome(prepared, policy):
+    """Index of the first enabled rule that fires per scenario (-1 for none) and its decision code."""
+    n = len(prepared["totals"])
+    rule_index = np.full(n, -1, dtype=np.int8)
+    decision = np.full(n, -1, dtype=np.int8)
+    undecided = np.ones(n, dtype=bool)
+    for index, name in enumerate(override_rule_names):
+        if name in policy["disabled_rules"]:
+            continue
+        if name == "ethical_concerns_high_score":
+            fires = prepared["immoral"] & (prepared["totals"] >= policy["ethical_override_score"])
+        else:
+            fires = prepared["masks"][name]
+        fires = fires & undecided
+        rule_index[fires] = index
+        code = override_rule_decisions[name]
+        if code is not None:
+            decision[fires] = code
+        undecided &= ~fires
+    return rule_index, decision
+
+
+def override_key(policy):
+    """Policies with the same key share their override outcome and differ only in score bands."""
+    return tuple(sorted(policy["disabled_rules"])), policy["ethical_override_score"]
+
+
+def evaluate_policy(prepared, policy):
+    """Final decision code per scenario under one policy; returns (decisions, rule_index)."""
+    policy = resolve_policy(policy)
+    rule_index, override = override_outcome(prepared, policy)
+    bands = score_band_codes(prepared["unique_totals"], policy["thresholds"])[prepared["total_codes"]]
+    return np.where(override >= 0, override, bands), rule_index
+
+
+def outcome_histogram(prepared, base_decisions, policy):
+    """Scenario counts per (baseline decision, outcome key) for one override configuration.
+
+    The outcome key is the override decision code (0-3) when a rule fires and
+    4 + the Total_Score code otherwise, so any set of thresholds can be applied
+    to the histogram instead of to every scenario.
+    """
+    _, override = override_outcome(prepared, policy)
+    keys = np.where(override >= 0, override, 4 + prepared["total_codes"])
+    width = 4 + len(prepared["unique_totals"])
+    return np.bincount(base_decisions * width + keys, minlength=4 * width).reshape(4, width)
+
+
+def transitions_from_histogram(prepared, histogram, thresholds):
+    """4x4 matrix of scenario counts from baseline decision (rows) to policy decision (columns)."""
+    key_decisions = np.concatenate([
+        np.arange(4, dtype=np.int8), score_band_codes(prepared["unique_totals"], thresholds)
+    ])
+    return np.stack([
+        np.bincount(key_decisions, weights=histogram[before], minlength=4) for before in range(4)
+    ]).astype(np.int64)
+
+
+def decision_deltas(transitions):
+    """Summary of how decisions moved relative to the baseline."""
+    n = int(transitions.sum())
+    changed = n - int(np.trace(transitions))
+    row = {"changed": changed, "changed_pct": round(changed / n * 100, 4) if n else 0.0}
+    counts = transitions.sum(axis=0)
+    for code, label in label_mapping.items():
+        row[label] = int(counts[code])
+    for before, after in itertools.permutations(label_mapping, 2):
+        if transitions[before, after]:
+            row[f"{label_mapping[before]} -> {label_mapping[after]}"] = int(transitions[before, after])
+    return row
+
+
+def evaluate_policies(scenarios, policies, baseline=None, workers=None):
+    """Decision deltas of each policy against the baseline, one row per policy."""
+    prepared = prepare_scenarios(scenarios) if isinstance(scenarios, pd.DataFrame) else scenarios
+    base_decisions, _ = evaluate_policy(prepared, baseline or DEFAULT_POLICY)
+    base_decisions = base_decisions.astype(np.int64)
+    policies = [resolve_policy(policy) for policy in policies]
+
+    # The per-scenario work is one pass per distinct override configuration
+    configurations = {override_key(policy): policy for policy in policies}
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        histograms = dict(zip(
+            configurations,
+            pool.map(lambda policy: outcome_histogram(prepared, base_decisions, policy), configurations.values())
+        ))
+
+    rows = []
+    for policy in policies:
+        transitions = transitions_from_histogram(prepared, histograms[override_key(policy)], policy["thresholds"])
+        rows.append({"policy": policy["name"], **decision_deltas(transitions)})
+    result = pd.DataFrame(rows)
+    counts = [column for column in result.columns if column not in ("policy", "changed_pct")]
+    result[counts] = result[counts].fillna(0).astype(int)
+    return result
+
+
+def threshold_grid(engage, ask, unknown):
+    """One policy per combination of band thresholds."""
+    return [
+        {
+            "name": f"engage={e} ask={a} unknown={u}",
+            "thresholds": {'Engage': e, 'Ask Authorization': a, 'Do Not Know': u},
+        }
+        for e, a, u in itertools.product(engage, ask, unknown)
+    ]
+
+
+def _float_list(text):
+    return [float(value) for value in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate alternative decision policies over a scenario table.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--scenarios", help="scenario table (.csv or .parquet)")
+    source.add_argument("--generate", type=int, help="generate this many scenarios from the study dataset")
+    parser.add_argument("--dataset", default="dataset_with_all_category_scores.csv")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--policies", help="JSON file with a list of policies")
+    parser.add_argument("--engage", type=_float_list, help="comma-separated Engage thresholds")
+    parser.add_argument("--ask", type=_float_list, help="comma-separated Ask Authorization thresholds")
+    parser.add_argument("--unknown", type=_float_list, help="comma-separated Do Not Know thresholds")
+    parser.add_argument("--disable-rule", action="append", default=[], choices=override_rule_names,
+                        help="also evaluate the baseline with this rule disabled (repeatable)")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--output", help="write the deltas table to this CSV")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.generate:
+        scenarios = generate_scenarios(pd.read_csv(args.dataset), args.generate, args.seed)
+    else:
+        scenarios = load_scenarios(args.scenarios)
+    prepared = prepare_scenarios(scenarios)
+    prepare_time = time.perf_counter() - start
+
+    policies = []
+    if args.policies:
+        with open(args.policies) as fh:
+            policies.extend(json.load(fh))
+    if args.engage or args.ask or args.unknown:
+        policies.extend(threshold_grid(
+            args.engage or [decision_thresholds['Engage']],
+            args.ask or [decision_thresholds['Ask Authorization']],
+            args.unknown or [decision_thresholds['Do Not Know']],
+        ))
+    for rule in args.disable_rule:
+        policies.append({"name": f"without {rule}", "disabled_rules": [rule]})
+    if not policies:
+        parser.error("no policies given (use --policies, --engage/--ask/--unknown or --disable-rule)")
+
+    start = time.perf_counter()
+    result = evaluate_policies(prepared, policies, workers=args.workers)
+    sweep_time = time.perf_counter() - start
+
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(result.to_string(index=False))
+    print(f"\n{len(policies)} policies x {len(prepared['totals'])} scenarios: "
+          f"prepared in {prepare_time:.2f}s, evaluated in {sweep_time:.2f}s")
+    if args.output:
+        result.to_csv(args.output, index=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from study_logging import get_logger
+
+logger = get_logger("result_log")
+
+
+def make_record_id(*parts):
+    """Deterministic ID for one result, so reruns and double clicks map to the same record."""
+    return hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:20]
+
+
+def read_log(wal_path):
+    """Return (all logged record IDs, unflushed rows by ID) from a results log."""
+    logged, pending = set(), OrderedDict()
+    if not os.path.exists(wal_path):
+        return logged, pending
+    with open(wal_path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logger.warning("Skipping truncated line in %s", wal_path)
+                continue
+            if entry["op"] == "append":
+                logged.add(entry["id"])
+                pending[entry["id"]] = entry["row"]
+            elif entry["op"] == "flushed":
+                pending.pop(entry["id"], None)
+    return logged, pending
+
+
+class ResultWriter:
+    """Local append-only write-ahead log in front of the results sheet.
+
+    ``submit`` appends the row to the log (fsynced) and returns; a background
+    thread flushes logged rows to the sheet returned by ``sheet_factory``.
+    Every row carries its record ID in the last column, and IDs already in
+    the log or on the sheet are skipped, so a record is written at most once
+    and survives failed appends and restarts.
+    """
+
+    def __init__(self, wal_path, sheet_factory, id_column, flush_interval=1.0, max_backoff=60.0):
+        self.wal_path = wal_path
+        self.sheet_factory = sheet_factory
+        self.id_column = id_column
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._logged = set()
+        self._pending = OrderedDict()
+        self._sheet = None
+        self._sheet_ids_loaded = False
+        self._replay()
+        self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+        self._thread.start()
+
+    def _replay(self):
+        """Rebuild state from the log and compact it down to the unflushed records."""
+        if not os.path.exists(self.wal_path):
+            return
+        self._logged, self._pending = read_log(self.wal_path)
+        tmp_path = f"{self.wal_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            for record_id, row in self._pending.items():
+                fh.write(json.dumps({"op": "append", "id": record_id, "row": row}) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, self.wal_path)
+        if self._pending:
+            logger.info("%s unflushed result(s) recovered from %s", len(self._pending), self.wal_path)
+
+    def _append(self, entry):
+        with open(self.wal_path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(entry, default=str) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def submit(self, record_id, row):
+        """Log a row for delivery; returns False when the record was already submitted."""
+        with self._lock:
+            if record_id in self._logged:
+                return False
+            row = list(row) + [record_id]
+            self._append({"op": "append", "id": record_id, "row": row})
+            self._logged.add(record_id)
+            self._pending[record_id] = row
+        self._wake.set()
+        return True
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _mark_flushed(self, record_id):
+        with self._lock:
+            self._append({"op": "flushed", "id": record_id})
+            self._pending.pop(record_id, None)
+
+    def flush(self):
+        """Deliver pending rows to the sheet; returns how many are still pending."""
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending.items())
+            if not batch:
+                return 0
+            if self._sheet is None:
+                self._sheet = self.sheet_factory()
+                if self._sheet is None:
+                    return len(batch)
+            try:
+                if not self._sheet_ids_loaded:
+                    # Rows appended before a crash but never marked as flushed
+                    on_sheet = set(self._sheet.col_values(self.id_column))
+                    self._sheet_ids_loaded = True
+                    for record_id, _ in batch:
+                        if record_id in on_sheet:
+                            self._mark_flushed(record_id)
+                    batch = [(record_id, row) for record_id, row in batch if record_id not in on_sheet]
+                for record_id, row in batch:
+                    self._sheet.append_row(row)
+                    self._mark_flushed(record_id)
+                    logger.info("Result %s appended to Google Sheets.", record_id)
+            except Exception as e:
+                logger.error("Error saving data to Google Sheets: %s", e)
+                self._sheet = None
+                self._sheet_ids_loaded = False
+            return self.pending_count()
+
+    def _run(self):
+        backoff = self.flush_interval
+        while True:
+            self._wake.wait(timeout=backoff)
+            self._wake.clear()
+            if self.flush():
+                backoff = min(backoff * 2, self.max_backoff)
+            else:
+                backoff = self.flush_interval
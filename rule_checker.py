@@ -0,0 +1,459 @@
+"""Consistency check of the override rules, score bands and model.
+
+Sweeps every combination of the columns apply_override_rules reads, plus
+the Total_Score values where a rule or band boundary changes, in parallel
+chunks. Each combination is run through the scalar apply_override_rules and
+through the vectorized rule masks of policy_sweep, and the sweep reports:
+
+- rules that can never fire (unreachable) or never fire first (shadowed),
+  and which earlier rules take their scenarios
+- exceptions apply_override_rules swallows, e.g. comparisons on an
+  unparseable Civilian_Presence
+- combinations where the vectorized rules disagree with the scalar ones
+- how often each rule overrides the score band decision
+
+Columns, literals and Total_Score boundaries are read from the source of
+apply_override_rules. Columns only compared against literals keep the values
+the rules name; the rest share one representative, weighted by their count,
+so the sweep covers the whole categorical space of the rule inputs. Columns
+the rules parse (probe_values) keep every value.
+
+The app path pass then runs --app-sample generated scenarios through
+get_final_prediction exactly as Step 5 calls it (a frame of the model's
+feature columns, cached score statistics) and reports the errors it logs and
+swallows, where its final decision differs from the rules and from the score
+band, and how the model's label compares with the band and that final
+decision. The
+model depends on all 19 features, so this is a sample rather than a sweep.
+
+    python rule_checker.py                       # all cores, exit 1 on exceptions or mismatches
+    python rule_checker.py --strict --json rules.json   # also fail on unreachable/shadowed rules
+"""
+import argparse
+import ast
+import inspect
+import json
+import logging
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import decision_logic
+from decision_logic import (
+    apply_override_rules, columns_to_shuffle, decision_thresholds, get_final_prediction, label_mapping,
+    score_band_codes, score_matrix, score_statistics
+)
+from policy_sweep import (
+    DEFAULT_POLICY, decision_codes, evaluate_policy, generate_scenarios, override_rule_decisions,
+    override_rule_for_reason, override_rule_names, prepare_scenarios
+)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Columns the rules parse rather than compare, with malformed values the sheet
+# or an edited dataset could hold
+probe_values = {"Civilian_Presence": ["", "unknown"]}
+
+# Set per worker process by _init_worker
+_space = None
+
+
+def _subscript_key(node, name):
+    if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name) and node.value.id == name:
+        if isinstance(node.slice, ast.Constant):
+            return node.slice.value
+    return None
+
+
+def _constants(nodes):
+    return {child.value for node in nodes for child in ast.walk(node) if isinstance(child, ast.Constant)}
+
+
+def rule_source_facts():
+    """Columns read via categories[...] with the literals each is compared to, and the Total_Score bounds.
+
+    Taken from the source of apply_override_rules.
+    """
+    tree = ast.parse(inspect.getsource(apply_override_rules))
+    literals, total_bounds = {}, set()
+    for node in ast.walk(tree):
+        column = _subscript_key(node, "categories")
+        if column is not None:
+            literals.setdefault(column, set())
+        if isinstance(node, ast.Compare):
+            column = _subscript_key(node.left, "categories")
+            if column is not None:
+                literals.setdefault(column, set()).update(_constants(node.comparators))
+            elif _subscript_key(node.left, "row") == "Total_Score":
+                total_bounds.update(value for value in _constants(node.comparators) if isinstance(value, (int, float)))
+    return literals, total_bounds
+
+
+def value_classes(values, literals, keep_all=False):
+    """(representatives, weights): the values the rules name plus one for all others, or every value."""
+    values = list(pd.unique(values))
+    if keep_all:
+        return values, [1] * len(values)
+    named = [value for value in values if value in literals]
+    others = [value for value in values if value not in literals]
+    return named + others[:1], [1] * len(named) + ([len(others)] if others else [])
+
+
+def total_breakpoints(df, total_bounds):
+    """Integer Total_Scores on both sides of every rule and band boundary, within the reachable range."""
+    lowest = sum(df[score].min() for _, score in columns_to_shuffle)
+    highest = sum(df[score].max() for _, score in columns_to_shuffle)
+    boundaries = set(total_bounds) | set(decision_thresholds.values()) | {DEFAULT_POLICY["ethical_override_score"]}
+    totals = {int(lowest), int(highest)}
+    for boundary in boundaries:
+        totals.update({math.ceil(boundary) - 1, math.ceil(boundary)})
+    return sorted(total for total in totals if lowest <= total <= highest)
+
+
+def build_space(df, probes=True):
+    literals, total_bounds = rule_source_facts()
+    dimensions = {}
+    for column, column_literals in literals.items():
+        values, weights = value_classes(df[column], column_literals, keep_all=column in probe_values)
+        if probes:
+            values = values + probe_values.get(column, [])
+            weights = weights + [1] * len(probe_values.get(column, []))
+        dimensions[column] = (values, weights)
+    totals = total_breakpoints(df, total_bounds)
+    dimensions["Total_Score"] = (totals, [1] * len(totals))
+    return dimensions
+
+
+class _LogCapture(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _init_worker(space):
+    global _space
+    _space = space
+    logger = logging.getLogger(decision_logic.logger.name)
+    logger.setLevel(logging.WARNING)
+    logger.propagate = False
+    _space["capture"] = _LogCapture()
+    logger.addHandler(_space["capture"])
+
+
+def _init_app_worker(space):
+    _init_worker(space)
+    _space["model"] = joblib.load(space["model_path"])
+    _space["feature_columns"] = joblib.load(space["features_path"])
+
+
+def _scalar_rule(decision, reason, errors):
+    """Index into override_rule_names of what the scalar rules did (-1 for no override)."""
+    if any(record.levelno >= logging.ERROR for record in errors):
+        return override_rule_names.index("civilian_presence_error")
+    if decision is None:
+        return -1
+    return override_rule_names.index(override_rule_for_reason(reason))
+
+
+def check_chunk(bounds):
+    start, stop = bounds
+    columns = list(_space["dimensions"])
+    shape = [len(values) for values, _ in _space["dimensions"].values()]
+    positions = np.unravel_index(np.arange(start, stop), shape)
+    frame = pd.DataFrame({
+        column: np.array(_space["dimensions"][column][0], dtype=object)[position]
+        for column, position in zip(columns, positions)
+    })
+    weights = np.ones(stop - start, dtype=np.int64)
+    for column, position in zip(columns, positions):
+        weights *= np.asarray(_space["dimensions"][column][1], dtype=np.int64)[position]
+
+    prepared = prepare_scenarios(frame)
+    decisions, vector_rule = evaluate_policy(prepared, DEFAULT_POLICY)
+    bands = score_band_codes(prepared["totals"])
+    conditions = np.stack([
+        prepared["immoral"] & (prepared["totals"] >= DEFAULT_POLICY["ethical_override_score"])
+        if name == "ethical_concerns_high_score" else prepared["masks"][name]
+        for name in override_rule_names
+    ], axis=1)
+
+    n_rules = len(override_rule_names)
+    scalar_rule = np.empty(len(frame), dtype=np.int8)
+    exceptions, warnings, mismatches = {}, {}, []
+    capture = _space["capture"]
+    records = frame.to_dict("records")
+    for i, record in enumerate(records):
+        capture.records.clear()
+        decision, reason = apply_override_rules(record)
+        scalar_rule[i] = _scalar_rule(decision, reason, capture.records)
+        for log_record in capture.records:
+            message = log_record.getMessage()
+            target = exceptions if log_record.levelno >= logging.ERROR else warnings
+            entry = target.setdefault(message, {"scenarios": 0, "example": record})
+            entry["scenarios"] += int(weights[i])
+        if scalar_rule[i] != vector_rule[i] and len(mismatches) < 5:
+            mismatches.append({"scenario": record, "scalar": int(scalar_rule[i]), "vectorized": int(vector_rule[i])})
+
+    # Which rule decided each scenario whose condition holds, per rule (last column: none)
+    decided_by = np.where(scalar_rule >= 0, scalar_rule, n_rules)
+    shadowing = np.zeros((n_rules, n_rules + 1), dtype=np.int64)
+    for rule in range(n_rules):
+        holds = conditions[:, rule]
+        shadowing[rule] = np.bincount(decided_by[holds], weights=weights[holds], minlength=n_rules + 1)
+    fired = scalar_rule >= 0
+    overrides_band = np.zeros(n_rules, dtype=np.int64)
+    np.add.at(overrides_band, scalar_rule[fired], weights[fired] * (decisions[fired] != bands[fired]))
+    outcome = np.zeros((4, 4), dtype=np.int64)
+    np.add.at(outcome, (bands, decisions), weights)
+    return {
+        "combinations": stop - start,
+        "scenarios": int(weights.sum()),
+        "shadowing": shadowing,
+        "overrides_band": overrides_band,
+        "outcome": outcome,
+        "exceptions": exceptions,
+        "warnings": warnings,
+        "mismatch_count": int((scalar_rule != vector_rule).sum()),
+        "mismatches": mismatches,
+    }
+
+
+def merge_messages(target, source):
+    for message, entry in source.items():
+        target.setdefault(message, {"scenarios": 0, "example": entry["example"]})["scenarios"] += entry["scenarios"]
+
+
+def sweep_rules(df, workers=None, chunk_size=20000, probes=True):
+    dimensions = build_space(df, probes)
+    total = math.prod(len(values) for values, _ in dimensions.values())
+    chunks = [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+    n_rules = len(override_rule_names)
+    result = {
+        "dimensions": {column: len(values) for column, (values, _) in dimensions.items()},
+        "combinations": 0,
+        "scenarios": 0,
+        "shadowing": np.zeros((n_rules, n_rules + 1), dtype=np.int64),
+        "overrides_band": np.zeros(n_rules, dtype=np.int64),
+        "outcome": np.zeros((4, 4), dtype=np.int64),
+        "exceptions": {},
+        "warnings": {},
+        "mismatch_count": 0,
+        "mismatches": [],
+    }
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=({"dimensions": dimensions},)) as pool:
+        for chunk in pool.map(check_chunk, chunks):
+            for key in ("combinations", "scenarios", "shadowing", "overrides_band", "outcome", "mismatch_count"):
+                result[key] = result[key] + chunk[key]
+            merge_messages(result["exceptions"], chunk["exceptions"])
+            merge_messages(result["warnings"], chunk["warnings"])
+            result["mismatches"].extend(chunk["mismatches"][:5 - len(result["mismatches"])])
+    return result
+
+
+def rule_findings(result):
+    """Per-rule reachability: condition holds, fires first, shadowed by which earlier rules."""
+    findings = []
+    for rule, name in enumerate(override_rule_names):
+        row = result["shadowing"][rule]
+        holds, first = int(row.sum()), int(row[rule])
+        shadowed_by = {
+            override_rule_names[other]: int(count)
+            for other, count in enumerate(row[:-1]) if other != rule and count
+        }
+        status = "unreachable" if holds == 0 else "shadowed" if first == 0 else "ok"
+        findings.append({
+            "rule": name,
+            "status": status,
+            "condition_holds": holds,
+            "fires_first": first,
+            "shadowed_by": shadowed_by,
+            "overrides_band": int(result["overrides_band"][rule]),
+        })
+    return findings
+
+
+def check_app_chunk(scenarios):
+    decisions, _ = evaluate_policy(prepare_scenarios(scenarios), DEFAULT_POLICY)
+    bands = score_band_codes(scenarios["Total_Score"].to_numpy())
+    # -1 where get_final_prediction returned no decision or no model label
+    final_codes = np.full(len(scenarios), -1, dtype=np.int8)
+    model_codes = np.full(len(scenarios), -1, dtype=np.int8)
+    exceptions, mismatches = {}, []
+    capture = _space["capture"]
+    for i in range(len(scenarios)):
+        # A pool row and its score statistics, as Step 2 draws it and Step 5 predicts it
+        scenario = scenarios.iloc[i]
+        scenario_data = pd.DataFrame([{col: scenario[col] for col in _space["feature_columns"]}])
+        capture.records.clear()
+        final, reason, model_label = get_final_prediction(
+            scenario_data, _space["model"], score_statistics(score_matrix(scenario))
+        )
+        final_codes[i] = decision_codes.get(final, -1)
+        model_codes[i] = decision_codes.get(model_label, -1)
+        for log_record in capture.records:
+            if log_record.levelno >= logging.ERROR:
+                entry = exceptions.setdefault(log_record.getMessage(), {"scenarios": 0, "example": scenario.to_dict()})
+                entry["scenarios"] += 1
+        if final_codes[i] != decisions[i] and len(mismatches) < 5:
+            mismatches.append({"scenario": scenario.to_dict(), "app": final, "reason": reason,
+                               "rules": label_mapping[decisions[i]]})
+
+    decided = final_codes >= 0
+    labelled = model_codes >= 0
+    outcome = np.zeros((4, 4), dtype=np.int64)
+    np.add.at(outcome, (decisions[decided], final_codes[decided]), 1)
+    matrix = np.zeros((4, 4), dtype=np.int64)
+    np.add.at(matrix, (model_codes[labelled & decided], final_codes[labelled & decided]), 1)
+    return {
+        "sample": len(scenarios),
+        "exceptions": exceptions,
+        "mismatch_count": int((final_codes != decisions).sum()),
+        "mismatches": mismatches,
+        "band_mismatch_count": int((final_codes != bands).sum()),
+        "outcome": outcome,
+        "model_vs_band": int((model_codes == bands).sum()),
+        "model_vs_final": int((model_codes[decided] == final_codes[decided]).sum()),
+        "matrix": matrix,
+    }
+
+
+def check_app_path(df, model_path, features_path, sample, workers=None, chunk_size=250, seed=0):
+    """Run generated scenarios through get_final_prediction as Step 5 does, against the rules and bands."""
+    scenarios = generate_scenarios(df, sample, seed)
+    chunks = [scenarios.iloc[start:start + chunk_size] for start in range(0, sample, chunk_size)]
+    result = {
+        "sample": 0,
+        "exceptions": {},
+        "mismatch_count": 0,
+        "mismatches": [],
+        "band_mismatch_count": 0,
+        "outcome": np.zeros((4, 4), dtype=np.int64),
+        "model_vs_band": 0,
+        "model_vs_final": 0,
+        "matrix": np.zeros((4, 4), dtype=np.int64),
+    }
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_app_worker,
+                             initargs=({"model_path": model_path, "features_path": features_path},)) as pool:
+        for chunk in pool.map(check_app_chunk, chunks):
+            for key in ("sample", "mismatch_count", "band_mismatch_count", "outcome", "model_vs_band", "model_vs_final", "matrix"):
+                result[key] = result[key] + chunk[key]
+            merge_messages(result["exceptions"], chunk["exceptions"])
+            result["mismatches"].extend(chunk["mismatches"][:5 - len(result["mismatches"])])
+    result["model_vs_band"] /= max(result["sample"], 1)
+    result["model_vs_final"] /= max(result["sample"], 1)
+    return result
+
+
+def print_matrix(title, matrix):
+    print(f"\n{title}")
+    labels = [label_mapping[code] for code in range(4)]
+    print(" " * 26 + "".join(f"{label:>19}" for label in labels))
+    for code, label in enumerate(labels):
+        print(f"  {label:<24}" + "".join(f"{int(count):>19}" for count in matrix[code]))
+
+
+def report(result, findings, app_result, elapsed):
+    space = " x ".join(f"{column} {size}" for column, size in result["dimensions"].items())
+    print(f"Rule input space: {space}")
+    print(f"Checked {result['combinations']:,} combinations standing for {result['scenarios']:,} scenarios "
+          f"in {elapsed:.1f}s ({result['combinations'] / elapsed:,.0f} combinations/s)")
+
+    print(f"\n{'rule':<40}{'status':<13}{'holds':>14}{'fires first':>14}{'overrides band':>16}")
+    for finding in findings:
+        print(f"{finding['rule']:<40}{finding['status']:<13}{finding['condition_holds']:>14,}"
+              f"{finding['fires_first']:>14,}{finding['overrides_band']:>16,}")
+        for other, count in finding["shadowed_by"].items():
+            print(f"    taken by {other}: {count:,}")
+    print_matrix("Score band (rows) vs final decision (columns), in scenarios:", result["outcome"])
+
+    if result["exceptions"]:
+        print("\nExceptions swallowed by apply_override_rules:")
+        for message, entry in result["exceptions"].items():
+            print(f"  {entry['scenarios']:,} scenarios: {message}")
+            print(f"    e.g. {entry['example']}")
+    if result["warnings"]:
+        print("\nWarnings logged by apply_override_rules:")
+        for message, entry in result["warnings"].items():
+            print(f"  {entry['scenarios']:,} scenarios: {message}")
+    if result["mismatch_count"]:
+        print(f"\n{result['mismatch_count']:,} combinations where policy_sweep's vectorized rules disagree:")
+        for mismatch in result["mismatches"]:
+            scalar, vectorized = (override_rule_names[i] if i >= 0 else "none" for i in (mismatch["scalar"], mismatch["vectorized"]))
+            print(f"  scalar {scalar}, vectorized {vectorized}: {mismatch['scenario']}")
+    if app_result:
+        print(f"\nApp path: {app_result['sample']:,} sampled scenarios through get_final_prediction as Step 5 calls it")
+        if app_result["exceptions"]:
+            print("Errors logged and swallowed on the app path:")
+            for message, entry in app_result["exceptions"].items():
+                print(f"  {entry['scenarios']:,} scenarios: {message}")
+                print(f"    e.g. {entry['example']}")
+        print(f"Final decision differs from the rules in {app_result['mismatch_count']:,} scenarios, "
+              f"from the score band in {app_result['band_mismatch_count']:,}")
+        for mismatch in app_result["mismatches"]:
+            print(f"  app {mismatch['app']} ({mismatch['reason'] or 'score band'}), rules {mismatch['rules']}: "
+                  f"{mismatch['scenario']}")
+        print_matrix("Rules and score band (rows) vs app final decision (columns):", app_result["outcome"])
+        print(f"\nModel label agrees with the score band {app_result['model_vs_band']:.2%}, "
+              f"with the app final decision {app_result['model_vs_final']:.2%}")
+        print_matrix("Model label (rows) vs app final decision (columns):", app_result["matrix"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check override rules, score bands and the model for consistency.")
+    parser.add_argument("--dataset", default=os.path.join(APP_DIR, "dataset_with_all_category_scores.csv"))
+    parser.add_argument("--workers", type=int, help="processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=20000)
+    parser.add_argument("--no-probes", action="store_true", help="skip malformed probe values")
+    parser.add_argument("--model", default=os.path.join(APP_DIR, "MDMP_model.joblib"))
+    parser.add_argument("--feature-columns", default=os.path.join(APP_DIR, "MDMP_feature_columns.joblib"))
+    parser.add_argument("--app-sample", type=int, default=2000,
+                        help="scenarios run through get_final_prediction as Step 5 does (0 skips the app path pass)")
+    parser.add_argument("--strict", action="store_true", help="also fail on unreachable or shadowed rules")
+    parser.add_argument("--json", help="write the findings to this file")
+    args = parser.parse_args()
+
+    # Checked here: a load failure in the pool initializer only shows as BrokenProcessPool
+    for path in [args.dataset] + ([args.model, args.feature_columns] if args.app_sample else []):
+        if not os.path.exists(path):
+            parser.error(f"{path} not found")
+    df = pd.read_csv(args.dataset)
+    start = time.perf_counter()
+    result = sweep_rules(df, args.workers, args.chunk_size, not args.no_probes)
+    elapsed = time.perf_counter() - start
+    findings = rule_findings(result)
+    app_result = None
+    if args.app_sample:
+        app_result = check_app_path(df, args.model, args.feature_columns, args.app_sample, args.workers)
+    report(result, findings, app_result, elapsed)
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({
+                "combinations": result["combinations"],
+                "scenarios": result["scenarios"],
+                "rules": findings,
+                "exceptions": result["exceptions"],
+                "mismatch_count": result["mismatch_count"],
+                "app_path": app_result,
+            }, fh, indent=2, default=lambda value: value.tolist() if isinstance(value, np.ndarray) else str(value))
+
+    failed = result["exceptions"] or result["mismatch_count"]
+    if app_result:
+        failed = failed or app_result["exceptions"] or app_result["mismatch_count"]
+    if args.strict:
+        failed = failed or any(finding["status"] != "ok" for finding in findings if override_rule_decisions[finding["rule"]] is not None)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+from decision_logic import label_mapping, score_matrix, score_statistics
+from policy_sweep import generate_scenarios
+
+# Reason for scenarios decided by the Total_Score band rather than an override rule
+SCORE_BAND = "score_band"
+
+
+class ScenarioSampler:
+    """Stratified draws from a pre-generated scenario pool.
+
+    The pool is indexed by the decision Step 5 shows and its reason, so a draw
+    from any stratum is a single random pick from an array of scenario IDs.
+    ``plan_session`` spreads a participant's scenarios evenly over the
+    outcomes, and within each outcome over its override reasons.
+    """
+
+    def __init__(self, pool, outcomes, reasons):
+        self.pool = pool.reset_index(drop=True)
+        groups = pd.Series(np.arange(len(self.pool))).groupby([np.asarray(outcomes), np.asarray(reasons)]).indices
+        self.strata = {}
+        for (outcome, reason), ids in groups.items():
+            self.strata.setdefault(outcome, {})[reason] = ids
+
+    @classmethod
+    def from_dataset(cls, df, pool_size, seed=None):
+        """Generate a pool from the study dataset and label it with the decision Step 5 shows.
+
+        Step 5 hands get_final_prediction only the model's feature columns, so
+        the override rules never see a category and the Total_Score band
+        decides every scenario; rule_checker.py's app path pass checks this.
+        """
+        pool = generate_scenarios(df, pool_size, seed)
+        # shuffle_dataset kept the dataset's other columns (Final_Decision) on every
+        # row; keep them so saved scenario_details have the same keys as before
+        rows = np.random.default_rng(seed).integers(0, len(df), pool_size)
+        for column in [column for column in df.columns if column not in pool.columns]:
+            pool.insert(pool.columns.get_loc("Total_Score"), column, df[column].to_numpy()[rows])
+        bands = score_statistics(score_matrix(pool))["bands"]
+        outcomes = np.array([label_mapping[code] for code in range(len(label_mapping))], dtype=object)[bands]
+        return cls(pool, outcomes, np.full(len(pool), SCORE_BAND, dtype=object))
+
+    def stratum_sizes(self):
+        return {
+            (outcome, reason): len(ids)
+            for outcome, reasons in self.strata.items()
+            for reason, ids in reasons.items()
+        }
+
+    def plan_session(self, rng, size):
+        """(outcome, reason) for each scenario of a session, with even quotas per outcome and reason."""
+        outcomes = sorted(self.strata)
+        rng.shuffle(outcomes)
+        per_outcome = {outcome: size // len(outcomes) for outcome in outcomes}
+        for outcome in outcomes[:size % len(outcomes)]:
+            per_outcome[outcome] += 1
+
+        plan = []
+        for outcome, count in per_outcome.items():
+            reasons = sorted(self.strata[outcome])
+            rng.shuffle(reasons)
+            plan.extend((outcome, reasons[i % len(reasons)]) for i in range(count))
+        rng.shuffle(plan)
+        return plan
+
+    def draw(self, rng, outcome, reason=None):
+        """A random pool scenario from the stratum; any reason of the outcome when reason is None."""
+        reasons = self.strata[outcome]
+        if reason is None:
+            reason = rng.choice(sorted(reasons))
+        ids = reasons[reason]
+        return self.pool.iloc[ids[rng.randrange(len(ids))]]
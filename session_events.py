@@ -0,0 +1,132 @@
+"""Compact binary log of a session's state transitions and inputs.
+
+One file per session: MAGIC, a header with the session start time and ID,
+then records of (milliseconds since start, event code, payload length,
+payload). Fixed-size payloads are packed with struct; text is UTF-8 and
+scenarios are JSON. Each record is a single append, without fsync: the log
+is for replay and analysis, and losing its tail in a crash costs nothing
+the results log does not already keep.
+
+    log = SessionEventLog.create("session_events", session_id)
+    log.record("next", from_step=3, to_step=4, new_step_index=0, scenario_count=1)
+    header, events = read_events(log.path)
+"""
+import json
+import os
+import struct
+import time
+
+MAGIC = b"SEVT1"
+HEADER = struct.Struct("<d16s")
+RECORD = struct.Struct("<IBH")
+TRANSITION = struct.Struct("<BBBB")
+TICK = struct.Struct("<H")
+DECISION_TIME = struct.Struct("<f")
+FLAG = struct.Struct("<B")
+
+# Transitions carry (from_step, to_step, new_step_index, scenario_count) after the move
+transition_events = ["next", "back", "new_scenario", "timeout"]
+event_codes = {
+    "next": 1,
+    "back": 2,
+    "new_scenario": 3,
+    "timeout": 4,
+    "scenario": 5,
+    "tick": 6,
+    "decision": 7,
+    "prediction": 8,
+    "confirmation": 9,
+    "feedback": 10,
+}
+event_names = {code: name for name, code in event_codes.items()}
+
+
+def encode_payload(name, fields):
+    if name in transition_events:
+        return TRANSITION.pack(fields["from_step"], fields["to_step"], fields["new_step_index"], fields["scenario_count"])
+    if name == "tick":
+        return TICK.pack(fields["time_remaining"])
+    if name == "decision":
+        return DECISION_TIME.pack(fields["decision_time"]) + fields["decision"].encode("utf-8")
+    if name == "feedback":
+        return FLAG.pack(fields["skipped"]) + fields["text"].encode("utf-8")
+    if name == "confirmation":
+        return fields["feedback"].encode("utf-8")
+    if name == "scenario":
+        # Series.to_json handles NumPy scalars
+        return fields["scenario"].to_json().encode("utf-8")
+    if name == "prediction":
+        return json.dumps([fields["final_decision"], fields["reason"], fields["raw_prediction"]], default=str).encode("utf-8")
+    raise ValueError(f"Unknown event {name!r}")
+
+
+def decode_payload(name, payload):
+    if name in transition_events:
+        return dict(zip(("from_step", "to_step", "new_step_index", "scenario_count"), TRANSITION.unpack(payload)))
+    if name == "tick":
+        return {"time_remaining": TICK.unpack(payload)[0]}
+    if name == "decision":
+        return {
+            "decision_time": DECISION_TIME.unpack_from(payload)[0],
+            "decision": payload[DECISION_TIME.size:].decode("utf-8"),
+        }
+    if name == "feedback":
+        return {"skipped": bool(FLAG.unpack_from(payload)[0]), "text": payload[FLAG.size:].decode("utf-8")}
+    if name == "confirmation":
+        return {"feedback": payload.decode("utf-8")}
+    if name == "scenario":
+        return {"scenario": json.loads(payload)}
+    if name == "prediction":
+        final_decision, reason, raw_prediction = json.loads(payload)
+        return {"final_decision": final_decision, "reason": reason, "raw_prediction": raw_prediction}
+    raise ValueError(f"Unknown event {name!r}")
+
+
+class SessionEventLog:
+    """Event log of one session; the file is only created by the first record,
+    so page views and imports that never record anything leave no file."""
+
+    def __init__(self, directory, session_id, started):
+        self.directory = directory
+        self.path = os.path.join(directory, f"{session_id}.evt")
+        self.session_id = session_id
+        self.started = started
+        self._header_written = False
+
+    @classmethod
+    def create(cls, directory, session_id):
+        return cls(directory, session_id, time.time())
+
+    def record(self, name, **fields):
+        payload = encode_payload(name, fields)
+        elapsed_ms = int((time.time() - self.started) * 1000)
+        data = RECORD.pack(elapsed_ms, event_codes[name], len(payload)) + payload
+        if not self._header_written:
+            os.makedirs(self.directory, exist_ok=True)
+        # Opened per record so idle sessions hold no file descriptor
+        with open(self.path, "ab", buffering=0) as fh:
+            if not self._header_written:
+                if fh.tell() == 0:
+                    data = MAGIC + HEADER.pack(self.started, bytes.fromhex(self.session_id)) + data
+                self._header_written = True
+            fh.write(data)
+
+
+def read_events(path):
+    """Return ({"session", "started"}, [(elapsed_ms, name, fields), ...]) from a session log."""
+    with open(path, "rb") as fh:
+        data = fh.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not a session event log")
+    started, session_id = HEADER.unpack_from(data, len(MAGIC))
+    header = {"session": session_id.hex(), "started": started}
+    events = []
+    offset = len(MAGIC) + HEADER.size
+    while offset + RECORD.size <= len(data):
+        elapsed_ms, code, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        if offset + length > len(data):
+            break  # Truncated last record
+        events.append((elapsed_ms, event_names[code], decode_payload(event_names[code], data[offset:offset + length])))
+        offset += length
+    return header, events
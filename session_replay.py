@@ -0,0 +1,220 @@
+"""Headless, parallel replay of session event logs through the study flow.
+
+Each log written by app_main.py (see session_events.py) is re-run against
+study_flow and decision_logic without Streamlit: transitions go through the
+same advance/go_back functions, scenarios get their score statistics and
+predictions are recomputed with the model. Every transition and prediction
+is checked against what the session logged, so a flow or decision-logic
+change that would have sent a participant somewhere else shows up as a
+mismatch. Per-event handler times are reported to find latency spikes.
+
+    python session_replay.py session_events/ --workers 8            # as fast as possible
+    python session_replay.py session_events/abc.evt --speed 20      # 20x real time
+    python session_replay.py session_events/ --no-model --json replay.json
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import pandas as pd
+
+from decision_logic import get_final_prediction, score_matrix, score_statistics
+from latency_stats import percentile
+from session_events import read_events
+from study_flow import (
+    SCENARIO_DONE, advance, expire_timer, go_back, initial_state, reset_scenario, start_new_scenario
+)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Loaded once per worker process
+_model = None
+_feature_columns = None
+
+transition_functions = {
+    "next": advance,
+    "back": go_back,
+    "new_scenario": start_new_scenario,
+    "timeout": expire_timer,
+}
+
+
+def _load_model(model_path, features_path):
+    global _model, _feature_columns
+    if model_path:
+        _model = joblib.load(model_path)
+        _feature_columns = joblib.load(features_path)
+
+
+def apply_event(state, name, fields):
+    """Apply one logged event to the flow state; returns a mismatch description or None."""
+    if name in transition_functions:
+        if state["step"] != fields["from_step"]:
+            return f"{name} logged from Step {fields['from_step']}, replay is at Step {state['step']}"
+        if name == "timeout":
+            state["user_decision"] = "No Decision - Time Expired"
+            state["decision_time"] = 300
+            state["submitted_decision"] = True
+            state["timer_active"] = False
+        if transition_functions[name](state) == SCENARIO_DONE:
+            reset_scenario(state)
+        logged = (fields["to_step"], fields["new_step_index"], fields["scenario_count"])
+        replayed = (state["step"], state["new_step_index"], state["scenario_count"])
+        if logged != replayed:
+            return f"{name} from Step {fields['from_step']}: logged (step, index, scenario) {logged}, replayed {replayed}"
+    elif name == "scenario":
+        state["scenario"] = pd.Series(fields["scenario"])
+        state["score_stats"] = score_statistics(score_matrix(state["scenario"]))
+        state["scenario_generated"] = True
+    elif name == "tick":
+        state["timer_active"] = True
+        state["time_remaining"] = fields["time_remaining"]
+    elif name == "decision":
+        state["user_decision"] = fields["decision"]
+        state["decision_time"] = fields["decision_time"]
+        state["submitted_decision"] = True
+        state["timer_active"] = False
+    elif name == "prediction":
+        if _model is None:
+            return None
+        scenario = state["scenario"]
+        scenario_data = pd.DataFrame([{col: scenario[col] for col in _feature_columns}])
+        final_decision, reason, raw_prediction = get_final_prediction(scenario_data, _model, state["score_stats"])
+        state["model_prediction_label"] = final_decision
+        state["override_reason"] = reason
+        state["raw_model_prediction"] = raw_prediction
+        state["model_generated"] = True
+        if (final_decision, reason) != (fields["final_decision"], fields["reason"]):
+            return (f"prediction: logged {fields['final_decision']!r} ({fields['reason'] or 'score band'}), "
+                    f"replayed {final_decision!r} ({reason or 'score band'})")
+    elif name == "confirmation":
+        state["confirmation_feedback"] = fields["feedback"]
+        state["submitted_feedback"] = True
+    return None
+
+
+def replay_session(path, speed=0.0):
+    """Replay one log; speed > 0 keeps the recorded gaps between events, divided by speed."""
+    header, events = read_events(path)
+    state = initial_state()
+    timings = defaultdict(list)
+    mismatches = []
+    start = time.perf_counter()
+    for elapsed_ms, name, fields in events:
+        if speed > 0:
+            delay = elapsed_ms / 1000 / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        event_start = time.perf_counter()
+        try:
+            mismatch = apply_event(state, name, fields)
+        except Exception as e:
+            mismatch = f"{name}: replay raised {e!r}"
+        timings[name].append((time.perf_counter() - event_start, elapsed_ms))
+        if mismatch:
+            mismatches.append({"at_ms": elapsed_ms, "event": name, "detail": mismatch})
+    return {
+        "session": header["session"],
+        "path": path,
+        "events": len(events),
+        "recorded_seconds": events[-1][0] / 1000 if events else 0.0,
+        "replay_seconds": time.perf_counter() - start,
+        "timings": dict(timings),
+        "mismatches": mismatches,
+    }
+
+
+def replay_logs(paths, workers=None, speed=0.0, model_path=None, features_path=None):
+    with ProcessPoolExecutor(max_workers=workers, initializer=_load_model,
+                             initargs=(model_path, features_path)) as pool:
+        return list(pool.map(replay_session, paths, [speed] * len(paths)))
+
+
+def summarize(results, wall_time, slowest=5):
+    timings = defaultdict(list)
+    for result in results:
+        for name, samples in result["timings"].items():
+            timings[name].extend((seconds, result["session"], elapsed_ms) for seconds, elapsed_ms in samples)
+
+    print(f"{'event':<14}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    summary = {}
+    for name, samples in sorted(timings.items()):
+        latencies = [seconds * 1000 for seconds, _, _ in samples]
+        summary[name] = {
+            "count": len(latencies),
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": max(latencies),
+        }
+        s = summary[name]
+        print(f"{name:<14}{s['count']:>7}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}")
+
+    recorded = sum(result["recorded_seconds"] for result in results)
+    events = sum(result["events"] for result in results)
+    print(f"\nReplayed {len(results)} session(s), {events} events in {wall_time:.2f}s "
+          f"({recorded:.1f}s recorded, {recorded / wall_time if wall_time else 0:.0f}x real time)")
+
+    spikes = sorted((sample + (name,) for name, samples in timings.items() for sample in samples), reverse=True)[:slowest]
+    if spikes:
+        print("\nSlowest events:")
+        for seconds, session, elapsed_ms, name in spikes:
+            print(f"  {seconds * 1000:8.2f} ms  {name:<14} session {session} at {elapsed_ms / 1000:.1f}s")
+
+    mismatches = [(result["session"], mismatch) for result in results for mismatch in result["mismatches"]]
+    if mismatches:
+        print(f"\n{len(mismatches)} mismatch(es) against the logged sessions:")
+        for session, mismatch in mismatches:
+            print(f"  session {session} at {mismatch['at_ms'] / 1000:.1f}s: {mismatch['detail']}")
+    return summary
+
+
+def expand_paths(paths):
+    expanded = []
+    for path in paths:
+        if os.path.isdir(path):
+            expanded.extend(sorted(glob.glob(os.path.join(path, "*.evt"))))
+        else:
+            expanded.append(path)
+    return expanded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay session event logs through the study flow.")
+    parser.add_argument("paths", nargs="+", help="event log files or directories of *.evt files")
+    parser.add_argument("--workers", type=int, help="replay processes (default: CPU count)")
+    parser.add_argument("--speed", type=float, default=0.0, help="keep recorded timing at this multiple of real time (0: no waits)")
+    parser.add_argument("--model", default=os.path.join(APP_DIR, "MDMP_model.joblib"))
+    parser.add_argument("--feature-columns", default=os.path.join(APP_DIR, "MDMP_feature_columns.joblib"))
+    parser.add_argument("--no-model", action="store_true", help="skip recomputing predictions")
+    parser.add_argument("--slowest", type=int, default=5, help="number of slowest events to list")
+    parser.add_argument("--json", help="write per-session results and the summary to this file")
+    args = parser.parse_args()
+
+    paths = expand_paths(args.paths)
+    if not paths:
+        parser.error("no event logs found")
+    model_path = None if args.no_model else args.model
+    # Checked here: a load failure in the pool initializer only shows as BrokenProcessPool
+    for path in ([args.model, args.feature_columns] if model_path else []):
+        if not os.path.exists(path):
+            parser.error(f"{path} not found (or pass --no-model)")
+    start = time.perf_counter()
+    results = replay_logs(paths, args.workers, args.speed, model_path, args.feature_columns)
+    wall_time = time.perf_counter() - start
+
+    summary = summarize(results, wall_time, args.slowest)
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"summary": summary, "sessions": results}, fh, indent=2)
+    return 1 if any(result["mismatches"] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
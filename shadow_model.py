@@ -0,0 +1,168 @@
+"""Shadow evaluation of a candidate model next to the production model.
+
+With STUDY_SHADOW_MODEL set, app_main.py hands every Step 5 prediction to a
+ShadowEvaluator. The candidate is loaded on its thread pool and runs the
+same get_final_prediction there after the participant's result is on
+screen, and each comparison is appended to a JSON lines file together with
+both models' latency. The file starts with a "models" entry recording each
+model's load time and in-memory size.
+
+    STUDY_SHADOW_MODEL=candidate.joblib streamlit run app_main.py
+    python shadow_model.py shadow_results.jsonl      # agreement and latency report
+"""
+import argparse
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import pandas as pd
+
+from decision_logic import get_final_prediction
+from latency_stats import percentile
+from study_logging import get_logger
+
+logger = get_logger("shadow_model")
+
+
+def model_size_mb(model):
+    """Pickled size of a fitted model, a proxy for the memory its arrays take."""
+    return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / 2**20
+
+
+def model_info(model, path, load_seconds):
+    return {
+        "path": path,
+        "type": type(model).__name__,
+        "load_seconds": round(load_seconds, 4),
+        "size_mb": round(model_size_mb(model), 3),
+    }
+
+
+class ShadowEvaluator:
+    """Scores Step 5 requests with a candidate model off the request path."""
+
+    def __init__(self, candidate_path, feature_columns, production, log_path, workers=2):
+        """production is (model, path, load seconds); feature_columns may be a joblib path.
+
+        Loading and sizing the models runs on the pool, so constructing the
+        evaluator on the request path costs nothing.
+        """
+        self.model = None
+        self.feature_columns = feature_columns
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shadow-model")
+        self._loaded = self._pool.submit(self._load, candidate_path, production)
+
+    def _load(self, candidate_path, production):
+        start = time.perf_counter()
+        self.model = joblib.load(candidate_path)
+        load_seconds = time.perf_counter() - start
+        if isinstance(self.feature_columns, str):
+            self.feature_columns = joblib.load(self.feature_columns)
+        self._append({
+            "type": "models",
+            "ts": time.time(),
+            "production": model_info(*production),
+            "candidate": model_info(self.model, candidate_path, load_seconds),
+        })
+
+    def _append(self, entry):
+        with self._lock:
+            with open(self.log_path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(entry, default=str) + "\n")
+
+    def submit(self, record_id, scenario, score_stats, production, production_timing):
+        """Queue a comparison; production is (final decision, reason, raw model label)."""
+        self._pool.submit(self._evaluate, record_id, scenario, score_stats, production, production_timing)
+
+    def _evaluate(self, record_id, scenario, score_stats, production, production_timing):
+        try:
+            self._loaded.result()
+            scenario_data = pd.DataFrame([{col: scenario[col] for col in self.feature_columns}])
+            cpu = time.thread_time()
+            start = time.perf_counter()
+            candidate = get_final_prediction(scenario_data, self.model, score_stats)
+            candidate_timing = (time.perf_counter() - start, time.thread_time() - cpu)
+            self._append({
+                "type": "comparison",
+                "id": record_id,
+                "ts": time.time(),
+                "production": {"raw": production[2],
+                               "ms": production_timing[0] * 1000, "cpu_ms": production_timing[1] * 1000},
+                "candidate": {"raw": candidate[2],
+                              "ms": candidate_timing[0] * 1000, "cpu_ms": candidate_timing[1] * 1000},
+                "agree": candidate[2] == production[2],
+            })
+        except Exception as e:
+            logger.error("Shadow evaluation of %s failed: %s", record_id, e)
+
+
+def read_results(path):
+    models, comparisons = None, []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            entry = json.loads(line)
+            if entry["type"] == "models":
+                models = entry
+            else:
+                comparisons.append(entry)
+    return models, comparisons
+
+
+def report(path):
+    models, comparisons = read_results(path)
+    if models:
+        print(f"{'model':<12}{'type':<28}{'size MB':>9}{'load s':>9}  path")
+        for role in ("production", "candidate"):
+            info = models[role]
+            print(f"{role:<12}{info['type']:<28}{info['size_mb']:>9.2f}{info['load_seconds']:>9.3f}  {info['path']}")
+    if not comparisons:
+        print("\nNo comparisons recorded.")
+        return None
+
+    # The final decision comes from the override rules and score band, never
+    # from the model, so the model labels are what a promotion changes
+    n = len(comparisons)
+    raw_agree = sum(entry["agree"] for entry in comparisons)
+    print(f"\n{n} Step 5 predictions compared")
+    print(f"Model label agreement: {raw_agree / n:7.2%} ({n - raw_agree} differ)")
+
+    print(f"\n{'model':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'cpu ms':>10}")
+    latency = {}
+    for role in ("production", "candidate"):
+        ms = [entry[role]["ms"] for entry in comparisons]
+        cpu_ms = sum(entry[role]["cpu_ms"] for entry in comparisons) / n
+        latency[role] = {"p50_ms": percentile(ms, 50), "p95_ms": percentile(ms, 95),
+                         "p99_ms": percentile(ms, 99), "max_ms": max(ms), "cpu_ms": cpu_ms}
+        s = latency[role]
+        print(f"{role:<12}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}{s['cpu_ms']:>10.2f}")
+
+    disagreements = Counter(
+        (entry["production"]["raw"], entry["candidate"]["raw"]) for entry in comparisons if not entry["agree"]
+    )
+    if disagreements:
+        print("\nModel label disagreements (production -> candidate):")
+        for (production, candidate), count in disagreements.most_common():
+            print(f"  {production} -> {candidate}: {count}")
+    return {"comparisons": n, "label_agreement": raw_agree / n, "latency": latency}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report shadow model agreement, latency and size.")
+    parser.add_argument("results", nargs="?", default="shadow_results.jsonl")
+    args = parser.parse_args()
+    if not os.path.exists(args.results):
+        parser.error(f"{args.results} not found")
+    report(args.results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""Incremental Parquet export and compaction of the Study_data sheet.
+
+Each run reads only the rows appended since the last checkpoint, in
+batches of A1 ranges, parses the packed scenario_details column back into
+the scenario columns and writes one Parquet file per batch under a
+hive-style export_date=YYYY-MM-DD partition. The checkpoint (next sheet row)
+is updated after every file, and file names carry their sheet rows, so an
+interrupted run is simply repeated. --compact merges each partition's
+batch files into one.
+
+    python sheet_export.py --output study_export --credentials service_account.json
+    python sheet_export.py --output study_export --sheet-stub study_data.csv   # LocalSheet fake
+    python sheet_export.py --output study_export --compact
+
+    pd.read_parquet("study_export")   # every exported row, with an export_date column
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+import pandas as pd
+
+from decision_logic import columns_to_shuffle, score_columns
+from sheets_stub import LocalSheet
+
+# Leading "_" and "." keep these out of pd.read_parquet(output_dir)
+CHECKPOINT_FILE = "_checkpoint.json"
+# Sheet columns A-G, in the order save_data_to_google_sheet writes them
+result_columns = [
+    "scenario_details",
+    "participant_decision",
+    "model_prediction",
+    "decision_time_seconds",
+    "confirmation_feedback",
+    "additional_feedback",
+    "record_id",
+]
+scenario_columns = [column for pair in columns_to_shuffle for column in pair] + ["Total_Score"]
+numeric_columns = score_columns + ["Total_Score"]
+# Other dataset columns scenario_details carries, e.g. "Final_Decision: nan";
+# split on them so they do not run into the previous value, then dropped
+ignored_detail_keys = ["Final_Decision"]
+
+# "key: value" pairs joined with ", "; values may contain ", " themselves, so
+# only split where a known column name follows
+_DETAILS_SEPARATOR = re.compile(
+    ", (?=(?:%s): )" % "|".join(re.escape(column) for column in scenario_columns + ignored_detail_keys)
+)
+
+
+def parse_scenario_details(text):
+    details = {}
+    for item in _DETAILS_SEPARATOR.split(text) if text else []:
+        key, sep, value = item.partition(": ")
+        if sep:
+            details[key] = value
+    return details
+
+
+def rows_to_frame(rows, first_row):
+    rows = [list(row) + [""] * (len(result_columns) - len(row)) for row in rows]
+    results = pd.DataFrame(rows, columns=result_columns)
+    scenarios = pd.DataFrame(
+        [parse_scenario_details(text) for text in results["scenario_details"]],
+        columns=scenario_columns,
+    )
+    for column in numeric_columns:
+        scenarios[column] = pd.to_numeric(scenarios[column], errors="coerce").astype("Int64")
+    frame = pd.concat([results.drop(columns="scenario_details"), scenarios], axis=1)
+    frame["decision_time_seconds"] = pd.to_numeric(frame["decision_time_seconds"], errors="coerce").astype(float)
+    frame.insert(0, "sheet_row", range(first_row, first_row + len(rows)))
+    return frame
+
+
+def read_checkpoint(output_dir, header_rows=0):
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return {"next_row": header_rows + 1}
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def write_checkpoint(output_dir, checkpoint):
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as fh:
+        json.dump(checkpoint, fh)
+    os.replace(f"{path}.tmp", path)
+
+
+def write_parquet(frame, path):
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def export_new_rows(sheet, output_dir, batch_rows=5000, header_rows=0, export_date=None):
+    """Export rows appended since the checkpoint; returns how many were written."""
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint = read_checkpoint(output_dir, header_rows)
+    partition = os.path.join(output_dir, f"export_date={export_date or datetime.date.today().isoformat()}")
+    last_column = chr(ord("A") + len(result_columns) - 1)
+    exported = 0
+    while True:
+        first_row = checkpoint["next_row"]
+        rows = sheet.get_values(f"A{first_row}:{last_column}{first_row + batch_rows - 1}")
+        # Trailing blank rows are not results
+        while rows and not any(rows[-1]):
+            rows.pop()
+        if not rows:
+            break
+        last_row = first_row + len(rows) - 1
+        os.makedirs(partition, exist_ok=True)
+        write_parquet(rows_to_frame(rows, first_row), os.path.join(partition, f"part-{first_row:08d}-{last_row:08d}.parquet"))
+        checkpoint = {"next_row": last_row + 1, "updated": time.time()}
+        write_checkpoint(output_dir, checkpoint)
+        exported += len(rows)
+        if len(rows) < batch_rows:
+            break
+    return exported
+
+
+def compact(output_dir):
+    """Merge the batch files of each partition into one file; returns the partitions compacted."""
+    compacted = 0
+    for partition in sorted(glob.glob(os.path.join(output_dir, "export_date=*"))):
+        parts = sorted(glob.glob(os.path.join(partition, "*.parquet")))
+        if len(parts) < 2:
+            continue
+        frame = pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True)
+        frame = frame.drop_duplicates("sheet_row").sort_values("sheet_row", ignore_index=True)
+        target = os.path.join(partition, f"compacted-{frame['sheet_row'].iloc[0]:08d}-{frame['sheet_row'].iloc[-1]:08d}.parquet")
+        write_parquet(frame, target)
+        for part in parts:
+            if part != target:
+                os.remove(part)
+        compacted += 1
+    return compacted
+
+
+def open_study_sheet(credentials_path):
+    import gspread
+    client = gspread.service_account(filename=credentials_path)
+    return client.open("Study_data").sheet1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export new Study_data rows to partitioned Parquet.")
+    parser.add_argument("--output", default="study_export", help="export directory")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--credentials", help="service account JSON for the Study_data sheet")
+    source.add_argument("--sheet-stub", help="LocalSheet CSV to read instead of Google Sheets")
+    parser.add_argument("--batch-rows", type=int, default=5000, help="rows per read and per Parquet file")
+    parser.add_argument("--header-rows", type=int, default=0, help="rows to skip on the first export")
+    parser.add_argument("--compact", action="store_true", help="merge each partition's files after exporting")
+    args = parser.parse_args()
+
+    if args.sheet_stub or args.credentials:
+        sheet = LocalSheet(args.sheet_stub) if args.sheet_stub else open_study_sheet(args.credentials)
+        start = time.perf_counter()
+        exported = export_new_rows(sheet, args.output, args.batch_rows, args.header_rows)
+        checkpoint = read_checkpoint(args.output, args.header_rows)
+        print(f"Exported {exported} row(s) in {time.perf_counter() - start:.2f}s; next sheet row {checkpoint['next_row']}")
+    elif not args.compact:
+        parser.error("one of --credentials, --sheet-stub or --compact is required")
+    if args.compact:
+        print(f"Compacted {compact(args.output)} partition(s) in {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+import csv
+import io
+import os
+import re
+import threading
+import time
+
+# A1 range such as "A2:G", "A2:G500" or "A2"
+_RANGE = re.compile(r"^([A-Z]+)(\d+)(?::([A-Z]+)(\d+)?)?$")
+
+
+def _column_index(letters):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index
+
+
+class LocalSheet:
+    """File-backed stand-in for the gspread worksheet behind "Study_data".
+
+    Implements the subset of the gspread Worksheet API the app and its tools
+    use. Rows are stored as CSV lines; ``latency`` emulates the round trip
+    of a Sheets API call.
+    """
+    _lock = threading.Lock()
+
+    def __init__(self, path, latency=0.0):
+        self.path = path
+        self.latency = latency
+
+    def _delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def append_row(self, values, value_input_option="RAW"):
+        self._delay()
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(values)
+        # One write per row so concurrent appenders never interleave a line
+        with self._lock, open(self.path, "a", newline="", encoding="utf-8") as fh:
+            fh.write(buffer.getvalue())
+
+    def get_all_values(self):
+        self._delay()
+        if not os.path.exists(self.path):
+            return []
+        with self._lock, open(self.path, newline="", encoding="utf-8") as fh:
+            return [row for row in csv.reader(fh)]
+
+    def get_values(self, range_name):
+        """Rows of an A1 range; an open-ended range like "A2:G" runs to the last row."""
+        match = _RANGE.match(range_name)
+        if not match:
+            raise ValueError(f"Unsupported range {range_name!r}")
+        first_col, first_row, last_col, last_row = match.groups()
+        first_col = _column_index(first_col)
+        last_col = _column_index(last_col) if last_col else first_col
+        end = int(last_row) if last_row else (None if last_col else int(first_row))
+        rows = self.get_all_values()[int(first_row) - 1:end]
+        return [row[first_col - 1:last_col] for row in rows]
+
+    def col_values(self, col):
+        return [row[col - 1] for row in self.get_all_values() if len(row) >= col]
+
+    @property
+    def row_count(self):
+        return len(self.get_all_values())
@@ -0,0 +1,222 @@
+"""Cold-start profiler for app_main.py.
+
+Imports app_main in a fresh interpreter with ``-X importtime``, breaks the
+startup down per imported module and per artifact load, and compares the
+result against startup_budget.json.
+
+    python startup_profiler.py                  # profile and check the budget
+    python startup_profiler.py --runs 5         # median over 5 cold starts
+    python startup_profiler.py --update-budget  # record current timings as the budget
+    python startup_profiler.py --strict         # also fail when over the target
+
+Exits with status 1 when a phase or the total regresses past the budget,
+or when no baseline has been recorded yet.
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+BUDGET_PATH = os.path.join(APP_DIR, "startup_budget.json")
+APP_MODULE = "app_main"
+
+# Runs inside the child interpreter. Timings go to a file: stderr carries the
+# -X importtime report, and a file cannot be garbled by whatever app_main or
+# its imports print.
+CHILD_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import app_main
+elapsed = time.perf_counter() - start
+with open(sys.argv[1], "w") as fh:
+    json.dump({"total": elapsed, "artifacts": app_main.startup_timings}, fh)
+"""
+
+
+def parse_importtime(stderr):
+    """Return [(depth, module, self_seconds, cumulative_seconds)] in report order."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped) - 1) // 2
+        entries.append((depth, stripped, int(parts[0]) / 1e6, int(parts[1]) / 1e6))
+    return entries
+
+
+def app_import_statements():
+    """Modules named by app_main's own top-level import statements."""
+    with open(os.path.join(APP_DIR, f"{APP_MODULE}.py"), encoding="utf-8") as fh:
+        tree = ast.parse(fh.read())
+    names = set()
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.add(node.module)
+    return names
+
+
+def app_imports(entries):
+    """Split the modules app_main imports into its import statements and lazy imports.
+
+    Lazy imports happen while app_main runs, e.g. sklearn while unpickling the
+    model, and are already part of the matching artifact load time.
+    """
+    statements = app_import_statements()
+    children = []
+    for depth, name, _, cumulative in entries:
+        if depth == 0:
+            if name == APP_MODULE:
+                direct = {f"import {child}": seconds for child, seconds in children if child in statements}
+                lazy = {child: seconds for child, seconds in children if child not in statements}
+                return direct, lazy
+            children = []
+        elif depth == 1:
+            children.append((name, cumulative))
+    return {}, {}
+
+
+def heaviest_packages(entries, limit=10):
+    """Top-level packages with the largest cumulative import time, wherever imported."""
+    totals = {}
+    for _, name, _, cumulative in entries:
+        if "." not in name:
+            totals[name] = max(totals.get(name, 0.0), cumulative)
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def profile_once():
+    fd, result_path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT, result_path],
+            cwd=APP_DIR, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            tail = "\n".join(proc.stderr.splitlines()[-20:])
+            raise RuntimeError(f"app_main failed to import:\n{tail}")
+        with open(result_path) as fh:
+            result = json.load(fh)
+    finally:
+        os.remove(result_path)
+
+    entries = parse_importtime(proc.stderr)
+    phases, lazy = app_imports(entries)
+    phases.update(result["artifacts"])
+    accounted = sum(phases.values())
+    phases["module init (other)"] = max(result["total"] - accounted, 0.0)
+    return {
+        "total": result["total"],
+        "phases": phases,
+        "lazy": lazy,
+        "heaviest": heaviest_packages(entries),
+    }
+
+
+def profile(runs):
+    samples = [profile_once() for _ in range(runs)]
+    phase_names = {name for sample in samples for name in sample["phases"]}
+    return {
+        "total": statistics.median(sample["total"] for sample in samples),
+        "phases": {
+            name: statistics.median(sample["phases"].get(name, 0.0) for sample in samples)
+            for name in phase_names
+        },
+        "lazy": samples[-1]["lazy"],
+        "heaviest": samples[-1]["heaviest"],
+    }
+
+
+def load_budget():
+    if not os.path.exists(BUDGET_PATH):
+        return {"target_seconds": 1.0, "tolerance": 0.2, "slack_seconds": 0.01, "total_seconds": None, "phases": {}}
+    with open(BUDGET_PATH) as fh:
+        return json.load(fh)
+
+
+def save_budget(budget, result):
+    budget["total_seconds"] = round(result["total"], 4)
+    budget["phases"] = {name: round(seconds, 4) for name, seconds in sorted(result["phases"].items())}
+    with open(BUDGET_PATH, "w") as fh:
+        json.dump(budget, fh, indent=2)
+        fh.write("\n")
+
+
+def check_budget(budget, result, strict=False):
+    """Print the report and return a list of budget violations."""
+    tolerance = budget.get("tolerance", 0.2)
+    # Absolute allowance on top, so millisecond phases do not flag on timer noise
+    slack = budget.get("slack_seconds", 0.01)
+    violations = []
+    print(f"{'phase':<40}{'seconds':>10}{'budget':>10}")
+    for name, seconds in sorted(result["phases"].items(), key=lambda item: item[1], reverse=True):
+        allowed = budget["phases"].get(name)
+        flag = ""
+        if allowed is not None and seconds > allowed * (1 + tolerance) + slack:
+            flag = "  REGRESSED"
+            violations.append(f"{name}: {seconds:.3f}s > {allowed:.3f}s")
+        allowed_text = f"{allowed:.3f}" if allowed is not None else "-"
+        print(f"{name:<40}{seconds:>10.3f}{allowed_text:>10}{flag}")
+
+    total_budget = budget.get("total_seconds")
+    total_text = f"{total_budget:.3f}" if total_budget is not None else "-"
+    print(f"{'total':<40}{result['total']:>10.3f}{total_text:>10}")
+    if total_budget is None:
+        violations.append(f"no baseline recorded in {os.path.basename(BUDGET_PATH)}; run with --update-budget")
+    elif result["total"] > total_budget * (1 + tolerance) + slack:
+        violations.append(f"total: {result['total']:.3f}s > {total_budget:.3f}s")
+
+    target = budget.get("target_seconds")
+    if target is not None:
+        print(f"\nCold start target: {target:.3f}s ({result['total'] - target:+.3f}s)")
+        if strict and result["total"] > target:
+            violations.append(f"total: {result['total']:.3f}s over target {target:.3f}s")
+
+    if result["lazy"]:
+        print("\nImported while app_main ran (included in the phases above):")
+        for module, seconds in sorted(result["lazy"].items(), key=lambda item: item[1], reverse=True):
+            print(f"  {module:<38}{seconds:>10.3f}")
+
+    print("\nHeaviest top-level packages:")
+    for package, seconds in result["heaviest"]:
+        print(f"  {package:<38}{seconds:>10.3f}")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile app_main.py cold start against a stored budget.")
+    parser.add_argument("--runs", type=int, default=3, help="cold starts to take the median over")
+    parser.add_argument("--update-budget", action="store_true", help="write the measured timings to the budget file")
+    parser.add_argument("--strict", action="store_true", help="fail when the total is over the target")
+    args = parser.parse_args()
+
+    result = profile(max(args.runs, 1))
+    budget = load_budget()
+    if args.update_budget:
+        save_budget(budget, result)
+        print(f"Budget written to {BUDGET_PATH}")
+        return 0
+
+    violations = check_budget(budget, result, strict=args.strict)
+    if violations:
+        print("\nStartup budget exceeded:")
+        for violation in violations:
+            print(f"  {violation}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Step transitions of the study, shared by the app and the replay engine.
+
+Every function takes the session state mapping: st.session_state in
+app_main.py, a plain dict when session_replay.py re-runs an event log.
+"""
+from study_logging import get_logger
+
+logger = get_logger("study_flow")
+
+# Scenarios 1-5 use the original step order, 6-10 the reordered one
+ORIGINAL_FLOW_SCENARIOS = 5
+STUDY_SCENARIOS = 10
+# Reordered flow includes Step 7: [2, 5, 6, 3, 4, 7, 8, 9]
+reorder_flow = [2, 5, 6, 3, 4, 7, 8, 9]
+
+# What a transition did besides moving within the scenario
+SCENARIO_DONE = "scenario_done"
+STUDY_DONE = "study_done"
+
+
+def initial_state():
+    """Flow state of a new session, as app_main initializes it."""
+    state = {"step": 1, "scenario_count": 1, "flow": "original", "new_step_index": 0}
+    reset_scenario(state)
+    return state
+
+
+def reset_scenario(state):
+    state["scenario"] = None
+    state["user_decision"] = None
+    state["model_prediction_label"] = None
+    state["override_reason"] = None
+    state["confirmation_feedback"] = None
+    state["feedback_shared"] = False
+    state["start_time"] = None
+    state["decision_time"] = None
+    state["submitted_decision"] = False
+    state["submitted_feedback"] = False
+    state["scenario_generated"] = False
+    state["model_generated"] = False
+    state["revealed_reasoning"] = False
+    state["raw_model_prediction"] = None
+    state["time_remaining"] = 300
+    state["timer_active"] = False
+    state["start"] = None
+    state["correlation_id"] = None
+    state["score_stats"] = None
+
+
+def advance(state):
+    """Next button; returns SCENARIO_DONE or STUDY_DONE when it ends a scenario, else None.
+
+    The caller resets the scenario state after SCENARIO_DONE.
+    """
+    if state["flow"] == "original":
+        if state["step"] < 9:
+            state["step"] += 1
+            logger.info("Original flow: Moved to Step %s", state["step"])
+            return None
+        # End of scenario in original flow: increment scenario_count
+        state["scenario_count"] += 1
+        logger.info("Completed scenario %s in original flow", state["scenario_count"] - 1)
+        if state["scenario_count"] > ORIGINAL_FLOW_SCENARIOS:
+            state["flow"] = "reordered"
+            state["new_step_index"] = 0
+        state["step"] = 2
+        return SCENARIO_DONE
+    if state["new_step_index"] < len(reorder_flow) - 1:
+        state["new_step_index"] += 1
+        state["step"] = reorder_flow[state["new_step_index"]]
+        logger.info("Reordered flow: Moved to Step %s (index %s)", state["step"], state["new_step_index"])
+        return None
+    state["scenario_count"] += 1
+    logger.info("Completed scenario %s in reordered flow", state["scenario_count"] - 1)
+    if state["scenario_count"] > STUDY_SCENARIOS:
+        return STUDY_DONE
+    state["new_step_index"] = 0
+    state["step"] = reorder_flow[0]
+    return SCENARIO_DONE
+
+
+def go_back(state):
+    """Back button."""
+    if state["flow"] == "original":
+        if state["step"] > 1:
+            state["step"] -= 1
+            state["timer_active"] = False
+            state["time_remaining"] = 300
+            logger.info("Original flow: Moved back to Step %s", state["step"])
+    elif state["new_step_index"] > 0:
+        state["new_step_index"] -= 1
+        state["step"] = reorder_flow[state["new_step_index"]]
+        logger.info("Reordered flow: Moved back to Step %s (index %s)", state["step"], state["new_step_index"])
+
+
+def start_new_scenario(state):
+    """Start New Scenario button on Step 9; returns STUDY_DONE or SCENARIO_DONE."""
+    state["scenario_count"] += 1
+    if state["scenario_count"] > STUDY_SCENARIOS:
+        return STUDY_DONE
+    if state["scenario_count"] <= ORIGINAL_FLOW_SCENARIOS:
+        state["flow"] = "original"
+    else:
+        state["flow"] = "reordered"
+        state["new_step_index"] = 0
+    state["step"] = 2
+    return SCENARIO_DONE
+
+
+def expire_timer(state):
+    """Step 4 timer reaching zero moves on to the next step number."""
+    state["step"] += 1
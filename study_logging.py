@@ -0,0 +1,132 @@
+"""Structured, sampled logging for the study app and its tools.
+
+Records are handed to a queue unformatted and written as JSON lines by a
+background listener thread, so the request path only pays for the level
+check, the sampling counter and the enqueue. Call sites pass %-style args
+(``logger.info("Moved to Step %s", step)``) so nothing is formatted for
+records that are filtered out.
+
+Configuration comes from the environment:
+
+    STUDY_LOG_LEVEL     level of the "study" loggers (default WARNING)
+    STUDY_LOG_FILE      write to this file instead of stderr
+    STUDY_LOG_SAMPLING  per-event sampling, e.g. "step_entered=20,app_rerun=50"
+"""
+import atexit
+import contextvars
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+ROOT_LOGGER = "study"
+
+# Events logged on every rerun; keep one in N unless overridden
+DEFAULT_SAMPLE_RATES = {
+    "app_rerun": 20,
+    "step_entered": 20,
+}
+
+_log_context = contextvars.ContextVar("study_log_context", default={})
+_configure_lock = threading.Lock()
+_listener = None
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def get_logger(name):
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def set_log_context(**fields):
+    """Fields such as the session and scenario correlation ID added to every record from this context."""
+    _log_context.set({key: value for key, value in fields.items() if value is not None})
+
+
+class ContextFilter(logging.Filter):
+    def filter(self, record):
+        for key, value in _log_context.get().items():
+            setattr(record, key, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep one in every N records of an event; warnings and errors are never sampled."""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self._counters = {event: itertools.count() for event in rates}
+
+    def filter(self, record):
+        event = getattr(record, "event", None)
+        rate = self.rates.get(event)
+        if not rate or rate <= 1 or record.levelno >= logging.WARNING:
+            return True
+        if next(self._counters[event]) % rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread."""
+
+    def prepare(self, record):
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def parse_sample_rates(text):
+    rates = dict(DEFAULT_SAMPLE_RATES)
+    for item in filter(None, (part.strip() for part in (text or "").split(","))):
+        event, _, rate = item.partition("=")
+        rates[event.strip()] = int(rate)
+    return rates
+
+
+def configure_logging():
+    """Attach the queue handler to the "study" loggers once per process."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+        log_file = os.environ.get("STUDY_LOG_FILE")
+        output = logging.FileHandler(log_file, encoding="utf-8") if log_file else logging.StreamHandler(sys.stderr)
+        output.setFormatter(JsonFormatter())
+
+        log_queue = queue.SimpleQueue()
+        handler = DeferredQueueHandler(log_queue)
+        handler.addFilter(SamplingFilter(parse_sample_rates(os.environ.get("STUDY_LOG_SAMPLING"))))
+        handler.addFilter(ContextFilter())
+
+        logger = logging.getLogger(ROOT_LOGGER)
+        # WARNING keeps the request path as quiet as the unconfigured root logger
+        # was; STUDY_LOG_LEVEL=INFO turns on the per-step and per-rerun records
+        logger.setLevel(os.environ.get("STUDY_LOG_LEVEL", "WARNING").upper())
+        logger.addHandler(handler)
+        logger.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
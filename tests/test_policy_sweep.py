@@ -0,0 +1,30 @@
+import logging
+import os
+
+import pandas as pd
+
+from decision_logic import apply_override_rules, assign_final_decision, label_mapping
+from policy_sweep import DEFAULT_POLICY, evaluate_policy, generate_scenarios, override_rule_names, prepare_scenarios
+
+DATASET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dataset_with_all_category_scores.csv")
+
+
+def scalar_decision(row):
+    decision, _ = apply_override_rules(row)
+    return decision or assign_final_decision(row["Total_Score"])
+
+
+def test_vectorized_policy_matches_apply_override_rules(caplog):
+    # The unparseable values below log a warning or error per row
+    caplog.set_level(logging.CRITICAL, logger="study")
+    scenarios = generate_scenarios(pd.read_csv(DATASET), 5000, seed=7)
+    scenarios.loc[::7, "Civilian_Presence"] = "unknown"
+    scenarios.loc[3::11, "Civilian_Presence"] = ""
+
+    decisions, rule_index = evaluate_policy(prepare_scenarios(scenarios), DEFAULT_POLICY)
+
+    assert (rule_index == override_rule_names.index("civilian_presence_error")).any()
+    expected = [scalar_decision(row) for row in scenarios.to_dict("records")]
+    vectorized = [label_mapping[code] for code in decisions]
+    differing = [i for i, (scalar, vector) in enumerate(zip(expected, vectorized)) if scalar != vector]
+    assert not differing, scenarios.iloc[differing[:5]].to_dict("records")
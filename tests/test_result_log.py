@@ -0,0 +1,84 @@
+import json
+
+from result_log import ResultWriter, read_log
+from sheets_stub import LocalSheet
+
+ID_COLUMN = 7
+ROW = ["Target_Category: Chapel", "Engage", "Do Not Engage", 12.5, "Yes", ""]
+
+
+class FailAfterWrite(LocalSheet):
+    """Writes the row, then raises as if the response never arrived."""
+
+    def __init__(self, path, failures):
+        super().__init__(path)
+        self.failures = failures
+
+    def append_row(self, values, value_input_option="RAW"):
+        super().append_row(values, value_input_option)
+        if self.failures:
+            self.failures.pop()
+            raise ConnectionError("response lost")
+
+
+def drain(writer, attempts=5):
+    for _ in range(attempts):
+        if not writer.flush():
+            return
+    raise AssertionError(f"{writer.pending_count()} result(s) still pending")
+
+
+def ids_on_sheet(sheet):
+    return sheet.col_values(ID_COLUMN)
+
+
+def test_same_id_submitted_twice_is_written_once(tmp_path):
+    sheet = LocalSheet(str(tmp_path / "sheet.csv"))
+    writer = ResultWriter(str(tmp_path / "wal.jsonl"), lambda: sheet, ID_COLUMN, flush_interval=3600)
+
+    assert writer.submit("r1", ROW)
+    assert not writer.submit("r1", ROW)
+    drain(writer)
+    assert not writer.submit("r1", ROW)
+
+    assert ids_on_sheet(sheet) == ["r1"]
+    assert sheet.get_all_values()[0] == [str(value) for value in ROW] + ["r1"]
+
+
+def test_append_that_fails_after_writing_is_not_repeated(tmp_path):
+    path = str(tmp_path / "sheet.csv")
+    failures = [True]
+    writer = ResultWriter(str(tmp_path / "wal.jsonl"), lambda: FailAfterWrite(path, failures), ID_COLUMN,
+                          flush_interval=3600)
+
+    writer.submit("r1", ROW)
+    writer.submit("r2", ROW)
+    drain(writer)
+
+    assert not failures
+    assert ids_on_sheet(LocalSheet(path)) == ["r1", "r2"]
+    _, pending = read_log(str(tmp_path / "wal.jsonl"))
+    assert not pending
+
+
+def test_restart_recovers_unflushed_rows_without_duplicates(tmp_path):
+    sheet = LocalSheet(str(tmp_path / "sheet.csv"))
+    wal_path = tmp_path / "wal.jsonl"
+    # Crash after r1 reached the sheet but before it was marked flushed; r2 never got there
+    sheet.append_row(ROW + ["r1"])
+    with open(wal_path, "w", encoding="utf-8") as fh:
+        for record_id in ("r0", "r1", "r2"):
+            fh.write(json.dumps({"op": "append", "id": record_id, "row": ROW + [record_id]}) + "\n")
+        fh.write(json.dumps({"op": "flushed", "id": "r0"}) + "\n")
+        fh.write('{"op": "append", "id": "r3", "ro')
+
+    writer = ResultWriter(str(wal_path), lambda: sheet, ID_COLUMN, flush_interval=3600)
+    # Compacted to the unflushed records; the truncated line is dropped
+    assert [json.loads(line)["id"] for line in open(wal_path, encoding="utf-8")] == ["r1", "r2"]
+    assert not writer.submit("r0", ROW)
+
+    drain(writer)
+
+    assert ids_on_sheet(sheet) == ["r1", "r2"]
+    _, pending = read_log(str(wal_path))
+    assert not pending
@@ -0,0 +1,78 @@
+import glob
+import os
+
+import pandas as pd
+
+from policy_sweep import generate_scenarios
+from result_log import make_record_id
+from sheet_export import compact, export_new_rows, read_checkpoint, scenario_columns
+from sheets_stub import LocalSheet
+
+EXPORT_DATE = "2026-01-15"
+
+
+def study_scenarios(n, seed):
+    df = pd.read_csv(os.path.join(os.path.dirname(os.path.dirname(__file__)), "dataset_with_all_category_scores.csv"))
+    scenarios = generate_scenarios(df, n, seed)
+    # Values the parser has to keep intact: a leading space and an embedded ", "
+    scenarios.loc[0, "Civilian_Presence"] = " 11-29"
+    scenarios.loc[1, "Terrain_Type"] = "Urban Center, North"
+    return scenarios
+
+
+def append_results(sheet, scenarios, first_index, final_decision=False):
+    # Same row as save_data_to_google_sheet, plus the record ID ResultWriter appends
+    for offset, (_, scenario) in enumerate(scenarios.iterrows()):
+        index = first_index + offset
+        if final_decision:
+            # Scenario rows carry the dataset's Final_Decision column before Total_Score
+            scenario = pd.concat([scenario.drop("Total_Score"), pd.Series({"Final_Decision": float("nan"),
+                                                                          "Total_Score": scenario["Total_Score"]})])
+        scenario_details = ", ".join(f"{key}: {value}" for key, value in scenario.items())
+        sheet.append_row([
+            scenario_details, "Engage", "Do Not Engage", 10 + index / 4, "Yes", f"note {index}, continued",
+            make_record_id("session", index, "feedback"),
+        ])
+
+
+def part_files(output_dir):
+    return sorted(os.path.basename(path) for path in glob.glob(os.path.join(output_dir, "export_date=*", "*.parquet")))
+
+
+def test_incremental_export_and_compaction(tmp_path):
+    sheet = LocalSheet(str(tmp_path / "sheet.csv"))
+    output_dir = str(tmp_path / "export")
+    first, second = study_scenarios(7, 1), study_scenarios(4, 2)
+
+    append_results(sheet, first, 0, final_decision=True)
+    assert export_new_rows(sheet, output_dir, batch_rows=3, export_date=EXPORT_DATE) == 7
+    assert part_files(output_dir) == [
+        "part-00000001-00000003.parquet", "part-00000004-00000006.parquet", "part-00000007-00000007.parquet"
+    ]
+    assert export_new_rows(sheet, output_dir, batch_rows=3, export_date=EXPORT_DATE) == 0
+
+    append_results(sheet, second, 7)
+    assert export_new_rows(sheet, output_dir, batch_rows=3, export_date=EXPORT_DATE) == 4
+    assert read_checkpoint(output_dir)["next_row"] == 12
+    assert len(part_files(output_dir)) == 5
+
+    assert compact(output_dir) == 1
+    assert part_files(output_dir) == ["compacted-00000001-00000011.parquet"]
+
+    exported = pd.read_parquet(output_dir)
+    assert exported["sheet_row"].tolist() == list(range(1, 12))
+    assert exported["record_id"].tolist() == [make_record_id("session", index, "feedback") for index in range(11)]
+    assert exported["additional_feedback"].tolist() == [f"note {index}, continued" for index in range(11)]
+    assert exported["decision_time_seconds"].tolist() == [10 + index / 4 for index in range(11)]
+    assert set(exported["export_date"].astype(str)) == {EXPORT_DATE}
+
+    expected = pd.concat([first, second], ignore_index=True)
+    for column in scenario_columns:
+        if column.endswith("_Score"):
+            assert exported[column].astype(int).tolist() == expected[column].astype(int).tolist(), column
+        else:
+            assert exported[column].tolist() == expected[column].astype(str).tolist(), column
+    assert exported.loc[0, "Civilian_Presence"] == " 11-29"
+    assert exported.loc[1, "Terrain_Type"] == "Urban Center, North"
+    assert "Final_Decision" not in exported.columns
+    assert exported[scenario_columns].notna().all().all()